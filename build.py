@@ -5,18 +5,30 @@ SPY Trading Suite v4.3 - TradingView Price Edition
 - IBKR only used for order execution
 - All calculations based on TV chart price
 """
-import json, threading, queue, re
+import json, threading, queue, re, time, bisect, hmac, heapq, random, zlib
+from collections import deque, OrderedDict, Counter
+from types import MappingProxyType
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
 import logging
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from ib_insync import IB, Option, LimitOrder, Stock, util
-import socket, sys
+import socket, sys, os, struct, atexit
+import gzip, hashlib, csv, io
+import traceback, tracemalloc
 import asyncio
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.connection import Listener, Client
+from concurrent.futures import ThreadPoolExecutor
+import math
+from zoneinfo import ZoneInfo
+import numpy as np
 
 VERSION = "4.3.0"
 
+MARKET_TZ = ZoneInfo('America/New_York')
+
 HTML = """<!DOCTYPE html>
 <html>
 <head>
@@ -83,6 +95,7 @@ HTML = """<!DOCTYPE html>
         
         .status-connected { background: #22c55e; box-shadow: 0 0 10px #22c55e; }
         .status-disconnected { background: #ef4444; box-shadow: 0 0 10px #ef4444; }
+        .status-reconnecting { background: #f59e0b; box-shadow: 0 0 10px #f59e0b; }
         
         .btn-place {
             background: linear-gradient(135deg, #22c55e, #16a34a);
@@ -148,6 +161,9 @@ HTML = """<!DOCTYPE html>
                 <div id="status-dot" class="status-dot status-disconnected"></div>
                 <h1 class="text-2xl font-bold text-cyan-400">SPY Trading Suite v4.3</h1>
                 <span class="text-xs text-gray-400 bg-blue-900/30 px-2 py-1 rounded">TV PRICE</span>
+                <select id="symbol-select" onchange="switchSymbol()" class="bg-black/40 border border-cyan-600 text-cyan-400 px-2 py-1 rounded font-bold">
+                    <option value="SPY">SPY</option>
+                </select>
             </div>
             <div class="text-right flex items-center gap-4">
                 <div class="flex gap-2">
@@ -161,7 +177,7 @@ HTML = """<!DOCTYPE html>
                 </div>
                 <div>
                     <div id="spy-live" class="text-4xl font-bold text-cyan-400">$---</div>
-                    <div class="text-xs text-gray-400">CURRENT PRICE</div>
+                    <div id="price-source" class="text-xs text-gray-400">CURRENT PRICE</div>
                 </div>
             </div>
         </div>
@@ -178,7 +194,7 @@ HTML = """<!DOCTYPE html>
             <div id="dashboard" class="p-4 h-full">
                 <div class="bg-blue-900/20 rounded-xl border border-blue-800 h-full flex flex-col">
                     <div class="p-4 border-b border-blue-800">
-                        <h2 class="text-lg font-bold text-cyan-400">TradingView SPY Chart</h2>
+                        <h2 class="text-lg font-bold text-cyan-400">TradingView <span id="chart-symbol">SPY</span> Chart</h2>
                         <p class="text-xs text-gray-400 mt-1">Price source for all calculations</p>
                     </div>
                     <div class="flex-1 overflow-hidden chart-container">
@@ -203,6 +219,41 @@ HTML = """<!DOCTYPE html>
             </div>
 
             <div id="trades" class="hidden p-4">
+                <h2 class="text-2xl font-bold text-cyan-400 mb-4">Account</h2>
+                <div class="grid grid-cols-4 gap-3 text-xs mb-6">
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Net Liquidation</span>
+                        <span class="text-white font-bold text-base" id="acct-netliq">$---</span>
+                    </div>
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Buying Power</span>
+                        <span class="text-white font-bold text-base" id="acct-bp">$---</span>
+                    </div>
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Init Margin</span>
+                        <span class="text-white font-bold text-base" id="acct-init-margin">$---</span>
+                    </div>
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Excess Liquidity</span>
+                        <span class="text-white font-bold text-base" id="acct-excess">$---</span>
+                    </div>
+                </div>
+                <h2 class="text-2xl font-bold text-cyan-400 mb-4">Positions</h2>
+                <div class="grid grid-cols-3 gap-3 text-xs mb-3">
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Realized P&L</span>
+                        <span class="font-bold text-base" id="pnl-realized">$0.00</span>
+                    </div>
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Unrealized P&L</span>
+                        <span class="font-bold text-base" id="pnl-unrealized">$0.00</span>
+                    </div>
+                    <div class="bg-black/30 p-2 rounded">
+                        <span class="text-gray-400 block">Total P&L</span>
+                        <span class="font-bold text-base" id="pnl-total">$0.00</span>
+                    </div>
+                </div>
+                <div id="positions-list" class="space-y-2 mb-6"></div>
                 <h2 class="text-2xl font-bold text-cyan-400 mb-4">Trade History</h2>
                 <div id="trades-list" class="space-y-2"></div>
             </div>
@@ -263,6 +314,35 @@ HTML = """<!DOCTYPE html>
                             <option value="P">PUT</option>
                         </select>
                     </div>
+                    <div class="grid grid-cols-2 gap-2">
+                        <div>
+                            <label class="text-xs text-gray-400">Strategy</label>
+                            <select id="strategy-select" onchange="if (currentStrike) setStrike(true)" class="w-full bg-black/40 border border-blue-700 text-white px-2 py-1 rounded text-xs">
+                                <option value="single">SINGLE</option>
+                                <option value="vertical">VERTICAL</option>
+                                <option value="straddle">STRADDLE</option>
+                                <option value="strangle">STRANGLE</option>
+                            </select>
+                        </div>
+                        <div>
+                            <label class="text-xs text-gray-400">Width ($)</label>
+                            <input id="combo-width" type="number" value="5" step="1" min="1" onchange="if (currentStrike) setStrike(true)" class="w-full bg-black/40 border border-blue-700 text-white px-2 py-1 rounded text-xs">
+                        </div>
+                    </div>
+                    <div>
+                        <label class="text-xs text-gray-400">Implied Vol (%)</label>
+                        <input id="iv-input" type="number" value="20" step="0.5" onchange="refreshServerLadder()" class="w-full bg-black/40 border border-blue-700 text-white px-2 py-1 rounded text-xs">
+                    </div>
+                    <div id="suggestion-box" class="hidden text-xs bg-blue-900/30 p-2 rounded border border-blue-700">
+                        <div class="flex justify-between items-center">
+                            <span class="text-gray-400">Suggested:</span>
+                            <span class="text-cyan-300 font-bold" id="suggestion-text">---</span>
+                            <button onclick="useSuggestion()" class="bg-blue-600 hover:bg-blue-500 text-white font-bold px-2 py-1 rounded">USE</button>
+                        </div>
+                        <label class="flex items-center gap-2 mt-1 text-gray-400">
+                            <input id="auto-follow" type="checkbox"> Auto-follow ATM
+                        </label>
+                    </div>
                     <button onclick="setStrike()" class="w-full bg-gradient-to-r from-blue-600 to-blue-500 hover:from-blue-500 hover:to-blue-400 text-white font-bold py-2 rounded text-sm mt-2">SET STRIKE</button>
                     
                     <div id="strike-info" class="text-xs bg-gradient-to-r from-green-900/40 to-transparent p-3 rounded border border-green-700 hidden mt-2">
@@ -274,10 +354,18 @@ HTML = """<!DOCTYPE html>
                             <span class="text-gray-400">Expiry:</span>
                             <span class="text-cyan-300 font-bold" id="selected-expiry">---</span>
                         </div>
-                        <div class="flex justify-between">
+                        <div class="flex justify-between mb-1">
                             <span class="text-gray-400">Type:</span>
                             <span class="text-cyan-300 font-bold" id="selected-type">---</span>
                         </div>
+                        <div class="flex justify-between mb-1">
+                            <span class="text-gray-400">Bid / Ask:</span>
+                            <span class="text-yellow-300 font-bold" id="selected-quote">---</span>
+                        </div>
+                        <div class="flex justify-between">
+                            <span class="text-gray-400">Delta:</span>
+                            <span class="text-cyan-300 font-bold" id="selected-delta">---</span>
+                        </div>
                     </div>
                 </div>
             </div>
@@ -286,7 +374,7 @@ HTML = """<!DOCTYPE html>
                 <h3 class="text-sm font-bold text-cyan-400 mb-2">Current Trade Levels</h3>
                 <div class="space-y-2">
                     <div class="flex justify-between items-center bg-blue-600/20 p-2 rounded border border-blue-600">
-                        <span class="text-xs text-gray-400">Entry (SPY):</span>
+                        <span class="text-xs text-gray-400">Entry (<span class="symbol-label">SPY</span>):</span>
                         <span class="text-cyan-300 font-bold text-lg" id="chart-trigger">$---</span>
                     </div>
                     <div class="flex justify-between items-center bg-green-600/20 p-2 rounded border border-green-600">
@@ -324,7 +412,7 @@ HTML = """<!DOCTYPE html>
                 </div>
                 
                 <div class="bg-blue-900/30 p-3 rounded border border-blue-700">
-                    <label class="text-xs text-gray-400">Entry Trigger (SPY Price)</label>
+                    <label class="text-xs text-gray-400">Entry Trigger (<span class="symbol-label">SPY</span> Price)</label>
                     <div id="quick-trigger" class="text-3xl font-bold text-cyan-400">$---</div>
                 </div>
                 
@@ -359,8 +447,12 @@ HTML = """<!DOCTYPE html>
     <script type="text/javascript" src="https://s3.tradingview.com/tv.js"></script>
     
     <script>
+        let currentSymbol = 'SPY';
+        let tvSymbol = 'AMEX:SPY';
+        let symbolInfo = {};
         let spyPrice = null;
         let lastSpyPrice = null;
+        let priceSource = null;
         let selectedLadderIndex = 0;
         let currentStrike = null;
         let currentExpiry = null;
@@ -370,6 +462,13 @@ HTML = """<!DOCTYPE html>
         let activeTradeId = null;
         let chartWidget = null;
         let priceCheckInterval = null;
+        let ladderMidIdx = 250;
+        let currentQuote = null;
+        let serverLadder = null;
+        let currentSuggestion = null;
+        let ladderRequestPending = false;
+        let quotesEnabled = true;
+        const clientId = Math.random().toString(36).slice(2);
 
         let optionPrices = [];
         for (let i = 0; i <= 1000; i++) {
@@ -379,7 +478,7 @@ HTML = """<!DOCTYPE html>
         function initChart() {
             chartWidget = new TradingView.widget({
                 "autosize": true,
-                "symbol": "NASDAQ:SPY",
+                "symbol": tvSymbol,
                 "interval": "1",
                 "timezone": "America/New_York",
                 "theme": "dark",
@@ -395,13 +494,11 @@ HTML = """<!DOCTYPE html>
         }
 
         function updateManualPrice() {
+            // An empty box clears the manual override on the server
             let manualInput = document.getElementById('manual-price-input').value;
-            if (manualInput && manualInput.length > 0) {
-                lastSpyPrice = spyPrice;
-                spyPrice = parseFloat(manualInput);
-                updatePriceDisplay();
-                console.log('Manual price set: $' + spyPrice.toFixed(2));
-            }
+            let price = manualInput && manualInput.length > 0 ? parseFloat(manualInput) : null;
+            reportPrice(price, 'manual');
+            if (price !== null) console.log('Manual price set: $' + price.toFixed(2));
         }
 
         function fetchCurrentPrice() {
@@ -422,55 +519,88 @@ HTML = """<!DOCTYPE html>
             priceCheckInterval = setInterval(extractPriceFromChart, 500);
         }
 
+        function priceInBand(price, trusted) {
+            // Accept scraped numbers only near the symbol's last known price;
+            // with no reference yet, only the OHLC close is trusted
+            let ref = spyPrice !== null ? spyPrice : symbolInfo.price;
+            if (!ref) return trusted && price > 0;
+            return Math.abs(price - ref) <= ref * 0.05;
+        }
+
+        async function loadSymbols() {
+            try {
+                let res = await fetch('/api/symbols');
+                let data = await res.json();
+                let select = document.getElementById('symbol-select');
+                select.innerHTML = data.symbols.map(s => '<option value="' + s.symbol + '">' + s.symbol + '</option>').join('');
+                window.symbolList = data.symbols;
+                select.value = currentSymbol;
+                applySymbol(data.symbols.find(s => s.symbol === data.default) || data.symbols[0]);
+            } catch (e) {
+                console.error('Symbol load error:', e);
+                initChart();
+            }
+        }
+
+        function applySymbol(info) {
+            symbolInfo = info;
+            currentSymbol = info.symbol;
+            tvSymbol = info.tv_symbol;
+            document.getElementById('symbol-select').value = currentSymbol;
+            document.getElementById('chart-symbol').innerText = currentSymbol;
+            document.querySelectorAll('.symbol-label').forEach(el => el.innerText = currentSymbol);
+            initChart();
+        }
+
+        function switchSymbol() {
+            let symbol = document.getElementById('symbol-select').value;
+            let info = (window.symbolList || []).find(s => s.symbol === symbol);
+            if (!info || symbol === currentSymbol) return;
+            
+            // Everything below is per-symbol state
+            navigator.sendBeacon('/api/quotes/release', JSON.stringify({client_id: clientId}));
+            clearInterval(priceCheckInterval);
+            spyPrice = null;
+            lastSpyPrice = null;
+            priceSource = null;
+            currentStrike = null;
+            currentExpiry = null;
+            currentQuote = null;
+            currentSuggestion = null;
+            serverLadder = null;
+            ladderMidIdx = 250;
+            selectedLadderIndex = 0;
+            document.getElementById('strike-info').classList.add('hidden');
+            document.getElementById('suggestion-box').classList.add('hidden');
+            document.getElementById('spy-live').innerText = '$---';
+            document.getElementById('price-source').innerText = 'CURRENT PRICE';
+            applySymbol(info);
+            renderLadder();
+        }
+
         function extractPriceFromChart() {
             try {
-                let manualInput = document.getElementById('manual-price-input').value;
-                if (manualInput && manualInput.length > 0) {
-                    return;
-                }
-                
-                let priceFound = false;
-                
                 let allText = document.body.innerText || document.body.textContent;
-                let pricePattern = /149\.\d{2}/g;
-                let matches = allText.match(pricePattern);
-                
-                if (matches && matches.length > 0) {
-                    let price = parseFloat(matches[0]);
-                    if (price > 140 && price < 160) {
-                        lastSpyPrice = spyPrice;
-                        spyPrice = price;
-                        priceFound = true;
-                        updatePriceDisplay();
-                        return;
-                    }
-                }
                 
                 let ohlcPattern = /O\s*(\d+\.\d{2})\s*H\s*(\d+\.\d{2})\s*L\s*(\d+\.\d{2})\s*C\s*(\d+\.\d{2})/;
                 let ohlcMatch = allText.match(ohlcPattern);
                 
                 if (ohlcMatch) {
                     let closePrice = parseFloat(ohlcMatch[4]);
-                    if (closePrice > 140 && closePrice < 160) {
-                        lastSpyPrice = spyPrice;
-                        spyPrice = closePrice;
-                        priceFound = true;
-                        updatePriceDisplay();
+                    if (priceInBand(closePrice, true)) {
+                        reportPrice(closePrice, 'scrape');
                         return;
                     }
                 }
                 
-                let generalPattern = /(\d{3}\.\d{2})/g;
+                let generalPattern = /(\d{1,4}\.\d{2})/g;
                 let allMatches = allText.match(generalPattern);
                 
                 if (allMatches) {
                     for (let match of allMatches) {
                         let price = parseFloat(match);
-                        if (price > 140 && price < 160) {
-                            lastSpyPrice = spyPrice;
-                            spyPrice = price;
-                            priceFound = true;
-                            updatePriceDisplay();
+                        if (priceInBand(price, false)) {
+                            reportPrice(price, 'scrape');
                             return;
                         }
                     }
@@ -481,6 +611,28 @@ HTML = """<!DOCTYPE html>
             }
         }
 
+        function reportPrice(price, source) {
+            // The server arbitrates between sources; the ladder follows its best price, not this tick
+            fetch('/api/update_price', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({price: price, symbol: currentSymbol, source: source, ts: Date.now() / 1000})
+            }).then(res => res.json()).then(applyBestPrice).catch(e => {});
+        }
+        
+        function applyBestPrice(data) {
+            if (data.status !== 'success') return;
+            if (data.price !== null && data.price !== undefined) {
+                lastSpyPrice = spyPrice;
+                spyPrice = data.price;
+                priceSource = data.source;
+                let age = data.age_ms !== null && data.age_ms !== undefined ? ' ' + Math.round(data.age_ms) + 'ms' : '';
+                document.getElementById('price-source').innerText = 'CURRENT PRICE' + (priceSource ? ' - ' + priceSource.toUpperCase() + age : '');
+                updatePriceDisplay();
+            }
+            showSuggestion(data.suggestion);
+        }
+        
         function updatePriceDisplay() {
             if (spyPrice === null) return;
             
@@ -488,19 +640,86 @@ HTML = """<!DOCTYPE html>
             
             if (lastSpyPrice === null || Math.abs(spyPrice - lastSpyPrice) > 0.01) {
                 renderLadder();
+                refreshServerLadder();
+            }
+        }
+
+        function triggerForIdx(idx) {
+            if (serverLadder) {
+                let t = serverLadder.triggers[idx];
+                return (t === null || t === undefined) ? null : t;
+            }
+            return spyPrice + (idx - ladderMidIdx) * 0.01;
+        }
+
+        function setLadderMid(newMid) {
+            // Keep the selected rung where it is when the mid moves
+            if (newMid === ladderMidIdx || newMid < 0 || newMid >= optionPrices.length) return;
+            let selectedIdx = ladderMidIdx + selectedLadderIndex;
+            ladderMidIdx = newMid;
+            selectedLadderIndex = selectedIdx - ladderMidIdx;
+        }
+
+        function comboLegs() {
+            // Legs built around the selected strike; null for a single-option order
+            let strategy = document.getElementById('strategy-select').value;
+            let width = parseFloat(document.getElementById('combo-width').value) || 5;
+            if (strategy === 'single' || !currentStrike || !currentExpiry) return null;
+            let leg = (strike, type, action) => ({strike: strike, expiry: currentExpiry, type: type, action: action, ratio: 1});
+            if (strategy === 'vertical') {
+                let far = currentType === 'C' ? currentStrike + width : currentStrike - width;
+                return [leg(currentStrike, currentType, 'BUY'), leg(far, currentType, 'SELL')];
+            }
+            if (strategy === 'straddle') return [leg(currentStrike, 'C', 'BUY'), leg(currentStrike, 'P', 'BUY')];
+            return [leg(currentStrike + width, 'C', 'BUY'), leg(currentStrike - width, 'P', 'BUY')];
+        }
+
+        function comboLabel(legs) {
+            return legs.map(l => (l.action === 'BUY' ? '+' : '-') + l.strike + l.type).join(' ');
+        }
+
+        async function refreshServerLadder() {
+            if (!currentStrike || !currentExpiry || spyPrice === null || ladderRequestPending) return;
+            ladderRequestPending = true;
+            try {
+                let iv = parseFloat(document.getElementById('iv-input').value) / 100;
+                let legs = comboLegs();
+                let res = legs
+                    ? await fetch('/api/combo_ladder', {
+                          method: 'POST',
+                          headers: {'Content-Type': 'application/json'},
+                          body: JSON.stringify({symbol: currentSymbol, legs: legs, iv: iv, spot: spyPrice})
+                      })
+                    : await fetch('/api/ladder?symbol=' + currentSymbol + '&strike=' + currentStrike + '&expiry=' + currentExpiry +
+                                  '&type=' + currentType + '&iv=' + iv + '&spot=' + spyPrice);
+                let data = await res.json();
+                if (data.status !== 'success') {
+                    console.error('Ladder error:', data.message);
+                    return;
+                }
+                serverLadder = data;
+                document.getElementById('selected-delta').innerText = data.greeks.delta.toFixed(3);
+                if (!currentQuote) {
+                    setLadderMid(Math.round(data.model_price * 100));
+                }
+                renderLadder();
+            } catch (e) {
+                console.error('Ladder refresh error:', e);
+            } finally {
+                ladderRequestPending = false;
             }
-            
-            fetch('/api/update_price', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({price: spyPrice})
-            }).catch(e => {});
         }
 
         function updateTradeLevels() {
             if (spyPrice === null) return;
             
-            let triggerPrice = spyPrice + (selectedLadderIndex * 0.01);
+            let triggerPrice = triggerForIdx(ladderMidIdx + selectedLadderIndex);
+            if (triggerPrice === null) {
+                ['chart-trigger', 'chart-tp', 'chart-sl', 'overlay-entry', 'overlay-tp', 'overlay-sl'].forEach(id => {
+                    document.getElementById(id).innerText = '$---';
+                });
+                return;
+            }
             let tpPrice = triggerPrice + parseFloat(document.getElementById('tp-input').value);
             let slPrice = triggerPrice - parseFloat(document.getElementById('sl-input').value);
             
@@ -519,9 +738,9 @@ HTML = """<!DOCTYPE html>
                 return;
             }
             
-            let midIdx = 250;
+            let midIdx = ladderMidIdx;
             let selectedIdx = midIdx + selectedLadderIndex;
-            let selectedTriggerPrice = spyPrice + (selectedLadderIndex * 0.01);
+            let selectedTriggerPrice = triggerForIdx(selectedIdx);
 
             let start = Math.max(0, selectedIdx - 15);
             let end = Math.min(optionPrices.length, selectedIdx + 16);
@@ -529,10 +748,15 @@ HTML = """<!DOCTYPE html>
 
             let html = display.map((optPrice, i) => {
                 let actualIdx = start + i;
-                let offset = (actualIdx - midIdx) * 0.01;
-                let triggerPrice = spyPrice + offset;
+                let triggerPrice = triggerForIdx(actualIdx);
                 let isSelected = actualIdx === selectedIdx;
-                let isMid = Math.abs(triggerPrice - spyPrice) < 0.005;
+                let isMid = actualIdx === midIdx;
+                let quoteTag = '';
+                if (currentQuote) {
+                    if (currentQuote.ask !== null && optPrice === currentQuote.ask.toFixed(2)) quoteTag += ' ASK';
+                    if (currentQuote.bid !== null && optPrice === currentQuote.bid.toFixed(2)) quoteTag += ' BID';
+                    if (currentQuote.last !== null && optPrice === currentQuote.last.toFixed(2)) quoteTag += ' LAST';
+                }
 
                 let cssClass = 'ladder-row w-full p-3 rounded text-sm font-mono transition-all ';
                 
@@ -544,31 +768,31 @@ HTML = """<!DOCTYPE html>
                     cssClass += 'bg-gray-800/50 text-gray-200 hover:bg-gray-700/70 border border-gray-700';
                 }
 
-                return '<button onclick="selectLadder(' + actualIdx + ')" class="' + cssClass + '"><div class="flex justify-between items-center"><span class="text-base font-bold">$' + optPrice + '</span><span class="text-sm text-gray-400">-></span><span class="text-base font-bold">$' + triggerPrice.toFixed(2) + '</span></div></button>';
+                return '<button onclick="selectLadder(' + actualIdx + ')" class="' + cssClass + '"><div class="flex justify-between items-center"><span class="text-base font-bold">$' + optPrice + '</span><span class="text-sm text-gray-400">' + (quoteTag ? '<span class="text-yellow-300 font-bold">' + quoteTag.trim() + '</span> ' : '') + '-></span><span class="text-base font-bold">' + (triggerPrice === null ? '$---' : '$' + triggerPrice.toFixed(2)) + '</span></div></button>';
             }).join('');
 
             document.getElementById('ladder-display').innerHTML = html;
 
             currentOptionPrice = parseFloat(optionPrices[selectedIdx]);
             document.getElementById('quick-price').innerText = '$' + optionPrices[selectedIdx];
-            document.getElementById('quick-trigger').innerText = '$' + selectedTriggerPrice.toFixed(2);
+            document.getElementById('quick-trigger').innerText = selectedTriggerPrice === null ? '$---' : '$' + selectedTriggerPrice.toFixed(2);
             document.getElementById('ladder-mid').innerText = '$' + optionPrices[midIdx];
             
             updateTradeLevels();
         }
 
         function selectLadder(idx) {
-            selectedLadderIndex = idx - 250;
+            selectedLadderIndex = idx - ladderMidIdx;
             renderLadder();
         }
 
         function ladderUp() {
-            if (selectedLadderIndex < 250) selectedLadderIndex++;
+            if (ladderMidIdx + selectedLadderIndex < optionPrices.length - 1) selectedLadderIndex++;
             renderLadder();
         }
 
         function ladderDown() {
-            if (selectedLadderIndex > -250) selectedLadderIndex--;
+            if (ladderMidIdx + selectedLadderIndex > 0) selectedLadderIndex--;
             renderLadder();
         }
 
@@ -577,7 +801,29 @@ HTML = """<!DOCTYPE html>
             renderLadder();
         }
 
-        function setStrike() {
+        function showSuggestion(s) {
+            if (!s) return;
+            currentSuggestion = s;
+            let label = s.expiry + (s.dte === 0 ? ' (0DTE)' : '') + '  $' + s.call + 'C / $' + s.put + 'P' + (s.qualified ? '' : ' ...');
+            document.getElementById('suggestion-text').innerText = label;
+            document.getElementById('suggestion-box').classList.remove('hidden');
+            
+            if (document.getElementById('auto-follow').checked) {
+                let type = document.getElementById('option-type').value;
+                let strike = type === 'C' ? s.call : s.put;
+                if (strike !== currentStrike || s.expiry !== currentExpiry) useSuggestion(true);
+            }
+        }
+
+        function useSuggestion(silent) {
+            if (!currentSuggestion) return;
+            let type = document.getElementById('option-type').value;
+            document.getElementById('strike-input').value = type === 'C' ? currentSuggestion.call : currentSuggestion.put;
+            document.getElementById('expiry-input').value = currentSuggestion.expiry;
+            setStrike(silent);
+        }
+
+        function setStrike(silent) {
             let strike = parseFloat(document.getElementById('strike-input').value);
             let expiry = document.getElementById('expiry-input').value;
             let type = document.getElementById('option-type').value;
@@ -593,9 +839,21 @@ HTML = """<!DOCTYPE html>
             
             document.getElementById('selected-strike').innerText = '$' + strike.toFixed(2);
             document.getElementById('selected-expiry').innerText = expiry;
-            document.getElementById('selected-type').innerText = type === 'C' ? 'CALL' : 'PUT';
+            let legs = comboLegs();
+            document.getElementById('selected-type').innerText = legs ? comboLabel(legs) : (type === 'C' ? 'CALL' : 'PUT');
             document.getElementById('strike-info').classList.remove('hidden');
             
+            serverLadder = null;
+            if (legs) {
+                // Leg quotes do not map onto net price rungs
+                currentQuote = null;
+                document.getElementById('selected-quote').innerText = '---';
+            } else {
+                subscribeQuotes();
+            }
+            refreshServerLadder();
+            
+            if (silent === true) return;
             alert('Strike set: $' + strike.toFixed(2) + ' ' + expiry + ' ' + (type === 'C' ? 'CALL' : 'PUT'));
         }
 
@@ -611,20 +869,28 @@ HTML = """<!DOCTYPE html>
             }
 
             let optionPrice = currentOptionPrice;
-            let triggerPrice = spyPrice + (selectedLadderIndex * 0.01);
+            let triggerPrice = triggerForIdx(ladderMidIdx + selectedLadderIndex);
+            if (triggerPrice === null) {
+                alert('Selected option price is not reachable for this contract');
+                return;
+            }
             let tp = parseFloat(document.getElementById('tp-input').value);
             let sl = parseFloat(document.getElementById('sl-input').value);
             let qty = parseInt(document.getElementById('qty-input').value);
+            let legs = comboLegs();
 
             try {
-                let res = await fetch('/api/execute_trade', {
+                // A combo goes out as one net-priced order so the legs fill together
+                let res = await fetch(legs ? '/api/execute_combo' : '/api/execute_trade', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
                     body: JSON.stringify({
+                        symbol: currentSymbol,
                         price: optionPrice,
                         strike: currentStrike,
                         expiry: currentExpiry,
                         type: currentType,
+                        legs: legs,
                         qty: qty,
                         tp: tp,
                         sl: sl,
@@ -877,6 +1143,8 @@ HTML = """<!DOCTYPE html>
                 let statusDot = document.getElementById('status-dot');
                 if (data.ibkr.status === 'connected') {
                     statusDot.className = 'status-dot status-connected';
+                } else if (data.ibkr.status === 'reconnecting') {
+                    statusDot.className = 'status-dot status-reconnecting';
                 } else {
                     statusDot.className = 'status-dot status-disconnected';
                 }
@@ -885,11 +1153,105 @@ HTML = """<!DOCTYPE html>
             }
         }
 
+        async function subscribeQuotes() {
+            currentQuote = null;
+            if (!quotesEnabled) return;
+            try {
+                let res = await fetch('/api/quotes/subscribe', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({client_id: clientId, symbol: currentSymbol, strike: currentStrike, expiry: currentExpiry, type: currentType})
+                });
+                let data = await res.json();
+                if (data.status !== 'success') quotesEnabled = false;
+            } catch (e) {
+                console.error('Quote subscribe error:', e);
+            }
+        }
+
+        async function refreshQuotes() {
+            if (!quotesEnabled || !currentStrike || !currentExpiry || comboLegs()) return;
+            try {
+                let res = await fetch('/api/quotes?symbol=' + currentSymbol + '&strike=' + currentStrike + '&expiry=' + currentExpiry + '&type=' + currentType);
+                let data = await res.json();
+                if (data.status !== 'success' || data.quotes.length === 0) return;
+                
+                let q = data.quotes[0];
+                currentQuote = q;
+                let fmt = v => v === null ? '---' : '$' + v.toFixed(2);
+                document.getElementById('selected-quote').innerText = fmt(q.bid) + ' / ' + fmt(q.ask) + ' (last ' + fmt(q.last) + ')';
+                
+                // Center the ladder on the live mid instead of the fixed $2.50 rung
+                if (q.bid !== null && q.ask !== null) {
+                    setLadderMid(Math.round((q.bid + q.ask) / 2 * 100));
+                }
+                renderLadder();
+            } catch (e) {
+                console.error('Quote refresh error:', e);
+            }
+        }
+
+        function setPnl(id, value) {
+            let el = document.getElementById(id);
+            el.innerText = (value < 0 ? '-$' : '$') + Math.abs(value).toFixed(2);
+            el.className = 'font-bold text-base ' + (value < 0 ? 'text-red-300' : 'text-green-300');
+        }
+
+        async function refreshPositions() {
+            try {
+                let res = await fetch('/api/positions?open_only=true');
+                let data = await res.json();
+                if (data.status !== 'success') return;
+                
+                setPnl('pnl-realized', data.realized_pnl);
+                setPnl('pnl-unrealized', data.unrealized_pnl);
+                setPnl('pnl-total', data.total_pnl);
+                
+                document.getElementById('positions-list').innerHTML = data.positions.map(p => {
+                    let pnl = p.unrealized_pnl + p.realized_pnl;
+                    let pnlColor = pnl < 0 ? 'text-red-300' : 'text-green-300';
+                    return '<div class="bg-blue-900/20 border border-blue-700 rounded-lg p-3 text-sm flex justify-between">' +
+                        '<span class="font-bold text-cyan-300">' + p.qty + 'x ' + p.symbol + ' ' + (p.expiry || '') + ' $' + (p.strike || '') + (p.right || '') + '</span>' +
+                        '<span class="text-gray-400">avg $' + p.avg_cost.toFixed(2) + ' / last $' + p.last_price.toFixed(2) + '</span>' +
+                        '<span class="font-bold ' + pnlColor + '">$' + pnl.toFixed(2) + '</span></div>';
+                }).join('');
+            } catch (e) {
+                console.error('Positions refresh error:', e);
+            }
+        }
+
+        async function refreshAccount() {
+            try {
+                let res = await fetch('/api/account');
+                let data = await res.json();
+                if (data.status !== 'success') return;
+                
+                let accounts = Object.values(data.accounts);
+                if (accounts.length === 0) return;
+                let summary = accounts[0].summary;
+                let fmt = v => (typeof v === 'number') ? '$' + v.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2}) : '$---';
+                document.getElementById('acct-netliq').innerText = fmt(summary.net_liquidation);
+                document.getElementById('acct-bp').innerText = fmt(summary.buying_power);
+                document.getElementById('acct-init-margin').innerText = fmt(summary.init_margin);
+                document.getElementById('acct-excess').innerText = fmt(summary.excess_liquidity);
+            } catch (e) {
+                console.error('Account refresh error:', e);
+            }
+        }
+
         function init() {
-            initChart();
+            loadSymbols();
             renderLadder();
             refreshStatus();
-            setInterval(refreshStatus, 5000);
+            setInterval(refreshStatus, 2000);
+            refreshPositions();
+            setInterval(refreshPositions, 1000);
+            refreshAccount();
+            setInterval(refreshAccount, 2000);
+            setInterval(refreshQuotes, 1000);
+            window.addEventListener('beforeunload', () => {
+                navigator.sendBeacon('/api/quotes/release', JSON.stringify({client_id: clientId}));
+            });
             
             document.getElementById('tp-input').addEventListener('input', updateTradeLevels);
             document.getElementById('sl-input').addEventListener('input', updateTradeLevels);
@@ -900,6 +1262,217 @@ HTML = """<!DOCTYPE html>
 </body>
 </html>"""
 
+_ib_insync = None
+_ib_insync_lock = threading.Lock()
+
+def ib_api():
+    """The ib_insync module, imported on first use.
+    
+    It is the slowest import in the process and only needed once a broker
+    connects, so the web UI comes up without it.
+    """
+    global _ib_insync
+    if _ib_insync is None:
+        with _ib_insync_lock:
+            if _ib_insync is None:
+                # eventkit binds the importing thread's event loop at import time
+                try:
+                    asyncio.get_event_loop_policy().get_event_loop()
+                except RuntimeError:
+                    asyncio.set_event_loop(asyncio.new_event_loop())
+                import ib_insync
+                _ib_insync = ib_insync
+    return _ib_insync
+
+class StartupTimer:
+    """Wall-clock phases of process startup, logged once the server listens and served by /api/startup."""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mark = self.started
+        self.phases = OrderedDict()
+        self.background = {}
+        self.listening_ms = None
+    
+    def phase(self, name):
+        """Close the phase that ran since the previous mark."""
+        now = time.perf_counter()
+        self.phases[name] = round((now - self.mark) * 1000, 2)
+        self.mark = now
+    
+    def timed(self, name, fn, *args):
+        """Run fn off the critical path and record how long it took."""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.background[name] = round((time.perf_counter() - started) * 1000, 2)
+    
+    def listening(self):
+        self.listening_ms = round((time.perf_counter() - self.started) * 1000, 2)
+    
+    def snapshot(self):
+        return {'phases_ms': dict(self.phases), 'background_ms': dict(self.background),
+                'listening_ms': self.listening_ms}
+
+def norm_cdf(x):
+    """Standard normal CDF for arrays (Abramowitz-Stegun 7.1.26, |error| < 1.5e-7)."""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+def years_to_expiry(expiry, now=None):
+    """Year fraction until 16:00 ET on a YYYYMMDD expiry, floored at one minute."""
+    now = now or datetime.now(MARKET_TZ)
+    close = datetime.strptime(expiry, '%Y%m%d').replace(hour=16, tzinfo=MARKET_TZ)
+    return max((close - now).total_seconds(), 60.0) / (365.0 * 24 * 3600)
+
+def bs_price(spot, strike, t, rate, iv, right):
+    spot = np.asarray(spot, dtype=float)
+    sqrt_t = math.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * iv * iv) * t) / (iv * sqrt_t)
+    d2 = d1 - iv * sqrt_t
+    discount = strike * math.exp(-rate * t)
+    if right == 'C':
+        return spot * norm_cdf(d1) - discount * norm_cdf(d2)
+    return discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+
+def bs_greeks(spot, strike, t, rate, iv, right):
+    """Delta, gamma, theta (per calendar day) and vega (per vol point)."""
+    spot = np.asarray(spot, dtype=float)
+    sqrt_t = math.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * iv * iv) * t) / (iv * sqrt_t)
+    d2 = d1 - iv * sqrt_t
+    pdf = norm_pdf(d1)
+    discount = strike * math.exp(-rate * t)
+    gamma = pdf / (spot * iv * sqrt_t)
+    vega = spot * pdf * sqrt_t / 100.0
+    if right == 'C':
+        delta = norm_cdf(d1)
+        theta = -spot * pdf * iv / (2 * sqrt_t) - rate * discount * norm_cdf(d2)
+    else:
+        delta = norm_cdf(d1) - 1.0
+        theta = -spot * pdf * iv / (2 * sqrt_t) + rate * discount * norm_cdf(-d2)
+    return {'delta': delta, 'gamma': gamma, 'theta': theta / 365.0, 'vega': vega}
+
+def solve_bracketed(f, fprime, x0, lo, hi, iterations=60, tol=1e-9):
+    """Vectorized Newton iteration, falling back to bisection wherever a step leaves its bracket.
+
+    Elements whose bracket does not contain a root come back as NaN.
+    """
+    x, lo, hi = np.array(x0, dtype=float), np.array(lo, dtype=float), np.array(hi, dtype=float)
+    f_lo, f_hi = f(lo), f(hi)
+    solvable = np.sign(f_lo) != np.sign(f_hi)
+    x = np.where((x > np.minimum(lo, hi)) & (x < np.maximum(lo, hi)), x, 0.5 * (lo + hi))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(iterations):
+            fx = f(x)
+            done = np.abs(fx) < tol
+            if done[solvable].all():
+                break
+            same = np.sign(fx) == np.sign(f_lo)
+            lo, f_lo = np.where(same, x, lo), np.where(same, fx, f_lo)
+            hi = np.where(same, hi, x)
+            step = x - fx / fprime(x)
+            inside = np.isfinite(step) & (step > np.minimum(lo, hi)) & (step < np.maximum(lo, hi))
+            x = np.where(done, x, np.where(inside, step, 0.5 * (lo + hi)))
+    return np.where(solvable, x, np.nan)
+
+def implied_vols(prices, spot, strikes, t, rate, is_call, lo=0.01, hi=5.0):
+    """Implied volatility for a whole array of option prices in one vectorized solve.
+
+    Prices outside the no-arbitrage range come back as NaN.
+    """
+    prices = np.asarray(prices, dtype=float)
+    strikes = np.asarray(strikes, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    sqrt_t = math.sqrt(t)
+    discount = strikes * math.exp(-rate * t)
+    
+    def price(sigma):
+        call = bs_price(spot, strikes, t, rate, sigma, 'C')
+        return np.where(is_call, call, call - spot + discount)
+    
+    def vega(sigma):
+        d1 = (np.log(spot / strikes) + (rate + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+        return spot * norm_pdf(d1) * sqrt_t
+    
+    # Brenner-Subrahmanyam starting point
+    x0 = np.clip(math.sqrt(2 * math.pi / t) * prices / spot, lo * 2, hi / 2)
+    return solve_bracketed(lambda sigma: price(sigma) - prices, vega, x0,
+                           np.full(prices.shape, lo), np.full(prices.shape, hi), tol=1e-7)
+
+def compute_ladder(spot, strike, expiry, right, rate, iv, rungs=1001, tick=0.01):
+    """Underlying price at which the option is worth each ladder rung, solved for all rungs at once."""
+    t = years_to_expiry(expiry)
+    targets = np.arange(rungs) * tick
+    lo = np.full(rungs, spot * 0.5)
+    hi = np.full(rungs, spot * 1.5)
+    triggers = solve_bracketed(
+        lambda s: bs_price(s, strike, t, rate, iv, right) - targets,
+        lambda s: bs_greeks(s, strike, t, rate, iv, right)['delta'],
+        np.full(rungs, float(spot)), lo, hi
+    )
+    triggers[targets <= 0] = np.nan
+    greeks = {k: float(v) for k, v in bs_greeks(spot, strike, t, rate, iv, right).items()}
+    return {
+        'spot': spot,
+        'model_price': float(bs_price(spot, strike, t, rate, iv, right)),
+        'greeks': greeks,
+        'years_to_expiry': t,
+        'triggers': [None if v != v else round(float(v), 2) for v in triggers]
+    }
+
+def compute_combo_ladder(spot, legs, rate, rungs=1001, tick=0.01):
+    """compute_ladder for a combo's net value; legs are (strike, expiry, right, weight, iv), weight signed by side.
+    
+    Net value need not be monotonic in the underlying (straddles, flies), so the
+    range is split where net delta crosses zero, each rung is solved on every
+    monotonic piece and the trigger nearest spot is kept.
+    """
+    legs = [(strike, years_to_expiry(expiry), right, weight, iv) for strike, expiry, right, weight, iv in legs]
+    targets = np.arange(rungs) * tick
+    
+    def value(s):
+        return sum(w * bs_price(s, k, t, rate, iv, right) for k, t, right, w, iv in legs)
+    
+    def delta(s):
+        return sum(w * bs_greeks(s, k, t, rate, iv, right)['delta'] for k, t, right, w, iv in legs)
+    
+    def gamma(s):
+        return sum(w * bs_greeks(s, k, t, rate, iv, right)['gamma'] for k, t, right, w, iv in legs)
+    
+    # Turning points of the net value: bracket delta sign changes on a grid, then refine
+    grid = np.linspace(spot * 0.5, spot * 1.5, 201)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grid_delta = delta(grid)
+    flips = np.nonzero(np.sign(grid_delta[:-1]) != np.sign(grid_delta[1:]))[0]
+    turns = solve_bracketed(delta, gamma, 0.5 * (grid[flips] + grid[flips + 1]), grid[flips], grid[flips + 1])
+    bounds = np.unique(np.concatenate(([spot * 0.5, float(spot), spot * 1.5], turns[np.isfinite(turns)])))
+    
+    triggers = np.full(rungs, np.nan)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        roots = solve_bracketed(lambda s: value(s) - targets, delta, np.full(rungs, 0.5 * (lo + hi)),
+                                np.full(rungs, lo), np.full(rungs, hi))
+        nearer = np.isfinite(roots) & ~(np.abs(triggers - spot) <= np.abs(roots - spot))
+        triggers = np.where(nearer, roots, triggers)
+    triggers[targets <= 0] = np.nan
+    greeks = {}
+    for k, t, right, w, iv in legs:
+        for name, v in bs_greeks(spot, k, t, rate, iv, right).items():
+            greeks[name] = greeks.get(name, 0.0) + w * float(v)
+    return {
+        'spot': spot,
+        'model_price': float(value(spot)),
+        'greeks': greeks,
+        'triggers': [None if v != v else round(float(v), 2) for v in triggers]
+    }
+
 class QueueHandler(logging.Handler):
     def __init__(self, log_queue):
         super().__init__()
@@ -908,104 +1481,2625 @@ class QueueHandler(logging.Handler):
     def emit(self, record):
         self.log_queue.put(record)
 
-class SPYTradingSuite:
+class PositionBook:
+    """Positions and P&L built from executions as they arrive.
+
+    Every fill, commission report or price mark touches one position and the
+    running totals, so reads never have to replay trade history.
+    """
+
     def __init__(self):
-        self.log_queue = queue.Queue()
-        self.setup_logging()
-        self.ib = None
-        self.ib_connected = False
-        self.config = self.load_config()
-        self.spy_price = None
-        self.last_ib_error = None
-        self.last_order_id = None
-        self.trades = {}
-        self.orders = {}
-        self.local_ip = self.get_local_ip()
-        self.webhook_port = self.config.get('webhook_port', 8080)
-        self.app = self.create_flask_app()
-        self.ib_queue = queue.Queue()
-        self.start_ib_thread()
-        self.logger.info("SPY Trading Suite v4.3 initialized - TV Price Mode")
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.seen_exec_ids = set()
+        self.seen_commission_ids = set()
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.commissions = 0.0
+
+    def on_fill(self, key, info, side, qty, price, multiplier=100, exec_id=None):
+        """Apply one execution; side is IB's 'BOT' or 'SLD'. Returns False for duplicates."""
+        with self.lock:
+            if exec_id:
+                if exec_id in self.seen_exec_ids:
+                    return False
+                self.seen_exec_ids.add(exec_id)
+
+            pos = self.positions.get(key)
+            if pos is None:
+                pos = dict(info)
+                pos.update({'qty': 0, 'avg_cost': 0.0, 'realized_pnl': 0.0, 'unrealized_pnl': 0.0,
+                            'commission': 0.0, 'last_price': price, 'multiplier': multiplier})
+                self.positions[key] = pos
+
+            signed = qty if side == 'BOT' else -qty
+            old_qty = pos['qty']
+            new_qty = old_qty + signed
+
+            if old_qty == 0 or (old_qty > 0) == (signed > 0):
+                # Opening or adding: blend the average cost
+                pos['avg_cost'] = (pos['avg_cost'] * abs(old_qty) + price * abs(signed)) / abs(new_qty)
+            else:
+                # Reducing, closing or flipping: realize against the average cost
+                closed = min(abs(signed), abs(old_qty))
+                direction = 1 if old_qty > 0 else -1
+                pnl = (price - pos['avg_cost']) * closed * pos['multiplier'] * direction
+                pos['realized_pnl'] += pnl
+                self.realized_pnl += pnl
+                if new_qty == 0:
+                    pos['avg_cost'] = 0.0
+                elif (new_qty > 0) != (old_qty > 0):
+                    pos['avg_cost'] = price
+
+            pos['qty'] = new_qty
+            self._mark(pos, price)
+            return True
+
+    def on_commission(self, key, commission, exec_id=None):
+        with self.lock:
+            if exec_id:
+                if exec_id in self.seen_commission_ids:
+                    return
+                self.seen_commission_ids.add(exec_id)
+            pos = self.positions.get(key)
+            if pos is None or not commission:
+                return
+            pos['commission'] += commission
+            pos['realized_pnl'] -= commission
+            self.commissions += commission
+            self.realized_pnl -= commission
+
+    def mark(self, key, price):
+        """Re-mark one position against its latest price."""
+        pos = self.positions.get(key)
+        if pos is None or price is None or price != price or price <= 0:
+            return
+        with self.lock:
+            self._mark(pos, price)
+
+    def _mark(self, pos, price):
+        pos['last_price'] = price
+        unrealized = (price - pos['avg_cost']) * pos['qty'] * pos['multiplier']
+        self.unrealized_pnl += unrealized - pos['unrealized_pnl']
+        pos['unrealized_pnl'] = unrealized
+
+    def snapshot(self, open_only=False):
+        with self.lock:
+            positions = [dict(pos, key=key) for key, pos in self.positions.items()
+                         if not open_only or pos['qty'] != 0]
+            return {
+                'positions': positions,
+                'realized_pnl': round(self.realized_pnl, 2),
+                'unrealized_pnl': round(self.unrealized_pnl, 2),
+                'total_pnl': round(self.realized_pnl + self.unrealized_pnl, 2),
+                'commissions': round(self.commissions, 2)
+            }
+
+class AccountCache:
+    """Account values and portfolio items kept current by IB account subscriptions."""
     
-    def setup_logging(self):
-        app_dir = Path.home() / ".spy_trading_suite"
-        app_dir.mkdir(exist_ok=True)
-        log_dir = app_dir / "logs"
-        log_dir.mkdir(exist_ok=True)
-        
-        log_file = log_dir / ("trader_" + datetime.now().strftime('%Y%m%d') + ".log")
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
-        file_handler = RotatingFileHandler(log_file, maxBytes=10*1024*1024, backupCount=5)
-        file_handler.setFormatter(formatter)
+    SUMMARY_TAGS = {
+        'NetLiquidation': 'net_liquidation',
+        'BuyingPower': 'buying_power',
+        'AvailableFunds': 'available_funds',
+        'ExcessLiquidity': 'excess_liquidity',
+        'InitMarginReq': 'init_margin',
+        'MaintMarginReq': 'maint_margin',
+        'TotalCashValue': 'cash',
+        'UnrealizedPnL': 'unrealized_pnl',
+        'RealizedPnL': 'realized_pnl'
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.portfolio = {}
+        self.updated_at = None
+    
+    def on_value(self, account, tag, value, currency):
+        with self.lock:
+            self.values[(account, tag, currency)] = value
+            self.updated_at = datetime.now()
+    
+    def on_portfolio(self, account, con_id, item):
+        with self.lock:
+            if item['position'] == 0:
+                self.portfolio.pop((account, con_id), None)
+            else:
+                self.portfolio[(account, con_id)] = item
+            self.updated_at = datetime.now()
+    
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+            self.portfolio.clear()
+            self.updated_at = None
+    
+    def snapshot(self):
+        with self.lock:
+            accounts = {}
+            for (account, tag, currency), value in self.values.items():
+                acct = accounts.setdefault(account, {'summary': {}, 'values': {}})
+                name = tag if currency in ('', 'BASE') else f"{tag}:{currency}"
+                acct['values'][name] = value
+                if tag in self.SUMMARY_TAGS and currency != 'BASE':
+                    try:
+                        acct['summary'][self.SUMMARY_TAGS[tag]] = float(value)
+                    except ValueError:
+                        acct['summary'][self.SUMMARY_TAGS[tag]] = value
+            for (account, con_id), item in self.portfolio.items():
+                accounts.setdefault(account, {'summary': {}, 'values': {}}).setdefault('portfolio', []).append(item)
+            return {
+                'accounts': accounts,
+                'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            }
+
+class RiskEngine:
+    """Pre-trade limits checked against running exposure aggregates.
+
+    Aggregates are adjusted as orders are reserved, placed, updated and
+    filled, so a check is a handful of dict lookups and comparisons.
+    """
+    
+    TERMINAL_STATUSES = ('Cancelled', 'ApiCancelled', 'Inactive', 'Filled')
+    
+    def __init__(self, config):
+        self.lock = threading.Lock()
+        self.limits = {
+            'max_order_qty': config['risk_max_order_qty'],
+            'max_order_notional': config['risk_max_order_notional'],
+            'max_open_orders': config['risk_max_open_orders'],
+            'max_open_notional': config['risk_max_open_notional'],
+            'max_strike_exposure': config['risk_max_strike_exposure'],
+            'max_orders_per_minute': config['risk_max_orders_per_minute']
+        }
+        self.multiplier = config['risk_multiplier']
+        self.next_token = 0
+        self.working = {}
+        self.open_notional = 0.0
+        self.working_by_strike = {}
+        self.position_by_strike = {}
+        self.recent_orders = deque()
+        self.checks = 0
+        self.rejections = 0
+    
+    @staticmethod
+    def strike_key(symbol, expiry, strike, right):
+        return (symbol, str(expiry), float(strike), right)
+    
+    def check_order(self, key, qty, price):
+        """Check an order and reserve its exposure. Returns (token, None) or (None, error)."""
+        return self.check_legs(((key, 1),), qty, price)
+    
+    def check_legs(self, legs, qty, price):
+        """check_order for an order on ((key, ratio), ...) legs, ratio negative for short legs.
         
-        self.logger = logging.getLogger('SPYTradingSuite')
-        self.logger.setLevel(logging.INFO)
-        self.logger.addHandler(file_handler)
+        `price` is the net debit per unit (negative for a credit); the order's
+        notional is its worst-case loss at expiry, so short and ratio combos
+        count their strike risk rather than the premium.
+        """
+        notional = self._notional(legs, qty, price)
+        now = time.monotonic()
+        limits = self.limits
         
-        queue_handler = QueueHandler(self.log_queue)
-        queue_handler.setFormatter(formatter)
-        self.logger.addHandler(queue_handler)
+        with self.lock:
+            self.checks += 1
+            while self.recent_orders and now - self.recent_orders[0] > 60:
+                self.recent_orders.popleft()
+            
+            over = self._over_strike_limit(legs, qty)
+            error = None
+            if qty <= 0:
+                error = f"Quantity must be positive (got {qty})"
+            elif self.max_loss(legs, price) is None:
+                error = "Short calls outnumber long calls; the combo's risk is unlimited"
+            elif qty > limits['max_order_qty']:
+                error = f"Order size {qty} exceeds max {limits['max_order_qty']} contracts"
+            elif notional > limits['max_order_notional']:
+                error = f"Order notional ${notional:,.2f} exceeds max ${limits['max_order_notional']:,.2f}"
+            elif len(self.working) >= limits['max_open_orders']:
+                error = f"Open order limit reached ({limits['max_open_orders']})"
+            elif self.open_notional + notional > limits['max_open_notional']:
+                error = f"Open notional would be ${self.open_notional + notional:,.2f}, max ${limits['max_open_notional']:,.2f}"
+            elif over:
+                key, exposure = over
+                error = f"Exposure on {key[0]} {key[1]} ${key[2]}{key[3]} would be {exposure} contracts, max {limits['max_strike_exposure']}"
+            elif len(self.recent_orders) >= limits['max_orders_per_minute']:
+                error = f"Order rate limit reached ({limits['max_orders_per_minute']}/min)"
+            
+            if error:
+                self.rejections += 1
+                return None, error
+            
+            self.next_token += 1
+            token = ('pending', self.next_token)
+            self._add_working(token, legs, qty, price)
+            self.recent_orders.append(now)
+            return token, None
     
-    def load_config(self):
-        app_dir = Path.home() / ".spy_trading_suite"
-        config_file = app_dir / "config.json"
+    def on_order_placed(self, token, order_id):
+        with self.lock:
+            entry = self.working.pop(token, None)
+            if entry:
+                self.working[order_id] = entry
+    
+    def release(self, order_id):
+        with self.lock:
+            self._remove_working(order_id)
+    
+    def on_order_status(self, order_id, status, remaining):
+        with self.lock:
+            if status in self.TERMINAL_STATUSES:
+                self._remove_working(order_id)
+                return
+            entry = self.working.get(order_id)
+            if entry and remaining < entry[1]:
+                legs, qty, price = entry
+                self._remove_working(order_id)
+                self._add_working(order_id, legs, remaining, price)
+    
+    def resync(self, open_orders):
+        """Replace placed-order exposure with the broker's open orders; unplaced reservations are kept."""
+        with self.lock:
+            for order_id in [k for k in self.working if not isinstance(k, tuple)]:
+                self._remove_working(order_id)
+            for order_id, (legs, qty, price) in open_orders.items():
+                self._add_working(order_id, legs, qty, price)
+    
+    def on_fill(self, key, side, qty):
+        signed = qty if side == 'BOT' else -qty
+        with self.lock:
+            self.position_by_strike[key] = self.position_by_strike.get(key, 0) + signed
+    
+    @staticmethod
+    def max_loss(legs, debit):
+        """Worst loss per unit at expiry in points: net debit minus the lowest intrinsic payoff. None when unlimited.
         
-        default = {
-            'webhook_port': 8080,
-            'ibkr_host': '127.0.0.1',
-            'ibkr_port': 7497,
-            'ibkr_client_id': 1,
-            'tp_dollars': 0.05,
-            'sl_dollars': 0.03
-        }
+        The payoff is piecewise linear with kinks at the strikes, so its minimum
+        is at zero or a strike unless net short calls make it fall without bound.
+        Longer-dated legs are worth at least intrinsic, so calendars are covered.
+        """
+        if sum(ratio for key, ratio in legs if key[3] == 'C') < 0:
+            return None
         
-        if config_file.exists():
-            try:
-                with open(config_file, 'r') as f:
-                    default.update(json.load(f))
-            except:
-                pass
+        def payoff(s):
+            return sum(ratio * (max(s - key[2], 0.0) if key[3] == 'C' else max(key[2] - s, 0.0)) for key, ratio in legs)
         
-        return default
+        return max(0.0, debit - min(payoff(s) for s in [0.0] + [key[2] for key, _ in legs]))
     
-    def get_local_ip(self):
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
+    def _notional(self, legs, qty, price):
+        loss = self.max_loss(legs, price)
+        if loss is None:
+            # Only broker-side orders get here (check_legs refuses them): count the short strikes
+            loss = max(price, 0.0) + sum(-ratio * key[2] for key, ratio in legs if ratio < 0)
+        return qty * loss * self.multiplier
+    
+    def _over_strike_limit(self, legs, qty):
+        """(key, resulting exposure) of the first leg that would breach the per-strike limit, or None."""
+        for key, ratio in legs:
+            exposure = self.working_by_strike.get(key, 0) + abs(self.position_by_strike.get(key, 0)) + qty * abs(ratio)
+            if exposure > self.limits['max_strike_exposure']:
+                return key, exposure
+        return None
+    
+    def _add_working(self, order_id, legs, qty, price):
+        self.working[order_id] = (legs, qty, price)
+        self.open_notional += self._notional(legs, qty, price)
+        for key, ratio in legs:
+            self.working_by_strike[key] = self.working_by_strike.get(key, 0) + qty * abs(ratio)
+    
+    def _remove_working(self, order_id):
+        entry = self.working.pop(order_id, None)
+        if entry is None:
+            return
+        legs, qty, price = entry
+        self.open_notional -= self._notional(legs, qty, price)
+        for key, ratio in legs:
+            self.working_by_strike[key] -= qty * abs(ratio)
+            if self.working_by_strike[key] <= 0:
+                del self.working_by_strike[key]
+    
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                'limits': dict(self.limits),
+                'open_orders': len(self.working),
+                'open_notional': round(self.open_notional, 2),
+                'orders_last_minute': sum(1 for t in self.recent_orders if now - t <= 60),
+                'strike_exposure': [
+                    {'symbol': k[0], 'expiry': k[1], 'strike': k[2], 'right': k[3],
+                     'working': self.working_by_strike.get(k, 0), 'position': self.position_by_strike.get(k, 0)}
+                    for k in set(self.working_by_strike) | set(self.position_by_strike)
+                ],
+                'checks': self.checks,
+                'rejections': self.rejections
+            }
+
+class OptionChainCache:
+    """Expirations and strikes from reqSecDefOptParams, sorted for bisect and hashed for membership."""
+    
+    def __init__(self):
+        self.expirations = []
+        self.strikes = []
+        self.expiration_set = frozenset()
+        self.strike_set = frozenset()
+        self.exchange = None
+        self.fetched_at = None
+    
+    def update(self, expirations, strikes, exchange):
+        # Build everything first, then swap references so readers never see a half-built chain
+        expirations = sorted(expirations)
+        strikes = sorted(float(k) for k in strikes)
+        self.expiration_set = frozenset(expirations)
+        self.strike_set = frozenset(strikes)
+        self.expirations = expirations
+        self.strikes = strikes
+        self.exchange = exchange
+        self.fetched_at = time.time()
+    
+    @property
+    def loaded(self):
+        return self.fetched_at is not None
+    
+    def nearest_strikes(self, strike, count=2):
+        i = bisect.bisect_left(self.strikes, strike)
+        return self.strikes[max(0, i - count):i + count + 1]
+
+class StrikeSelector:
+    """ATM / N-strikes-OTM and nearest-expiry suggestion, found by bisect on every price tick."""
+    
+    def __init__(self, chain, otm_strikes=0):
+        self.chain = chain
+        self.otm_strikes = otm_strikes
+        self.today = None
+        self.today_day = None
+        self.suggestion = None
+    
+    def _today(self):
+        # Key on the ET calendar date (the UTC day rolls over at 19:00/20:00 ET); format only on rollover
+        day = datetime.now(MARKET_TZ).date()
+        if day != self.today_day:
+            self.today_day = day
+            self.today = datetime.now(MARKET_TZ).strftime('%Y%m%d')
+        return self.today
+    
+    def select(self, spot):
+        """Returns (suggestion, changed). Suggestion is None until the chain is cached."""
+        strikes, expirations = self.chain.strikes, self.chain.expirations
+        if not strikes or not expirations or not spot:
+            return None, False
+        
+        e = bisect.bisect_left(expirations, self._today())
+        if e == len(expirations):
+            return None, False
+        expiry = expirations[e]
+        
+        i = bisect.bisect_left(strikes, spot)
+        if i == len(strikes) or (i > 0 and spot - strikes[i - 1] <= strikes[i] - spot):
+            i -= 1
+        n = self.otm_strikes
+        call = strikes[min(i + n, len(strikes) - 1)]
+        put = strikes[max(i - n, 0)]
+        
+        previous = self.suggestion
+        if previous and previous['expiry'] == expiry and previous['call'] == call and previous['put'] == put:
+            return previous, False
+        self.suggestion = {'expiry': expiry, 'atm': strikes[i], 'call': call, 'put': put,
+                           'otm_strikes': n, 'dte': 0 if expiry == self.today else None}
+        return self.suggestion, True
+
+class PriceArbiter:
+    """Best underlying price across IB stock ticks, TradingView webhooks, the chart scrape and manual entry.
+    
+    Ticks are stamped on arrival; when a source sends its own timestamp the
+    difference feeds that source's latency estimate (EWMA). The published
+    price is the freshest quote among non-stale sources, where a quote without
+    a timestamp is aged by its source's latency, and the more reliable source
+    wins when quotes are within `margin` seconds. A manual price overrides
+    everything until it is cleared. A tick more than `max_deviation` away
+    from a more reliable source is rejected, and a fresh quote that disagrees
+    with one is passed over, but only when that source is confirmed (its last
+    two ticks agree) and has ticked within the lower source's own stale
+    window. So a bad low-priority feed cannot lock out a better one, and one
+    stray tick from a higher-ranked source cannot veto a live feed either.
+    """
+    
+    # Most to least reliable
+    SOURCES = ('manual', 'ib', 'webhook', 'scrape')
+    
+    def __init__(self, stale_seconds, margin, max_deviation):
+        self.stale = stale_seconds
+        self.margin = margin
+        self.max_deviation = max_deviation
+        self.lock = threading.Lock()
+        self.feeds = {source: {'price': None, 'received': None, 'origin': None, 'latency': None, 'confirmed': False,
+                               'ticks': 0, 'rejected': 0}
+                      for source in self.SOURCES}
+        self.best = None
+        self.switches = 0
+    
+    @staticmethod
+    def parse_time(value):
+        """Epoch seconds from epoch seconds/milliseconds or an ISO-8601 string (TradingView {{timenow}})."""
+        if value is None or value == '':
+            return None
+        if isinstance(value, (int, float)) or re.fullmatch(r'\d+(\.\d+)?', str(value)):
+            value = float(value)
+            return value / 1000 if value > 1e11 else value
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    
+    def _fresh(self, source, now):
+        feed = self.feeds[source]
+        if feed['price'] is None:
+            return False
+        return source == 'manual' or now - feed['received'] <= self.stale.get(source, 5.0)
+    
+    def _disagrees(self, price, anchor):
+        return abs(price - anchor) > anchor * self.max_deviation
+    
+    def _anchor(self, source, now):
+        """The most reliable confirmed automatic source ranked above `source` that ticked within its stale window, or None."""
+        window = self.stale.get(source, 5.0)
+        for other in self.SOURCES[1:self.SOURCES.index(source)]:
+            feed = self.feeds[other]
+            if feed['confirmed'] and self._fresh(other, now) and now - feed['received'] <= window:
+                return other
+        return None
+    
+    def _quote_time(self, feed):
+        # A sender's clock can run ahead of ours; never trust a quote from the future
+        if feed['origin'] is not None:
+            return min(feed['origin'], feed['received'])
+        return feed['received'] - (feed['latency'] or 0.0)
+    
+    def _select(self, now):
+        if self.feeds['manual']['price'] is not None:
+            best = (self.feeds['manual']['price'], 'manual', self.feeds['manual']['received'])
+        else:
+            fresh = []
+            for source in self.SOURCES[1:]:
+                if not self._fresh(source, now):
+                    continue
+                anchor = self._anchor(source, now)
+                if not (anchor and self._disagrees(self.feeds[source]['price'], self.feeds[anchor]['price'])):
+                    fresh.append((source, self.feeds[source]))
+            # With every source stale the last published price stands
+            best = self.best if self.best and self.best[1] != 'manual' else None
+            if fresh:
+                newest = max(self._quote_time(feed) for _, feed in fresh)
+                source, feed = next((s, f) for s, f in fresh if self._quote_time(f) >= newest - self.margin)
+                best = (feed['price'], source, self._quote_time(feed))
+        if best and self.best and best[1] != self.best[1]:
+            self.switches += 1
+        self.best = best
+        return best
+    
+    def offer(self, source, price, origin=None):
+        """Record a tick (price None clears a manual price). Returns (best, error); best is (price, source, quote time)."""
+        now = time.time()
+        with self.lock:
+            feed = self.feeds[source]
+            if price is None:
+                feed['price'] = None
+                return self._select(now), None
+            anchor = self._anchor(source, now) if source != 'manual' else None
+            if anchor and self._disagrees(price, self.feeds[anchor]['price']):
+                feed['rejected'] += 1
+                anchor_price = self.feeds[anchor]['price']
+                return self._select(now), f"{source} price {price:.2f} is more than {self.max_deviation:.0%} from {anchor} {anchor_price:.2f}"
+            if origin is not None:
+                # A quote older than the stale window is kept (and loses) but says nothing about transport latency
+                sample = max(now - origin, 0.0)
+                if sample <= self.stale.get(source, 5.0):
+                    feed['latency'] = sample if feed['latency'] is None else feed['latency'] + 0.2 * (sample - feed['latency'])
+            confirmed = self._fresh(source, now) and not self._disagrees(price, feed['price'])
+            feed.update(price=price, received=now, origin=origin, confirmed=confirmed)
+            feed['ticks'] += 1
+            return self._select(now), None
+    
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            best = self._select(now)
+            return {
+                'price': best[0] if best else None,
+                'source': best[1] if best else None,
+                'age_ms': round((now - best[2]) * 1000, 1) if best else None,
+                'switches': self.switches,
+                'sources': {source: {
+                    'price': feed['price'],
+                    'age_ms': round((now - feed['received']) * 1000, 1) if feed['received'] else None,
+                    'latency_ms': round(feed['latency'] * 1000, 1) if feed['latency'] is not None else None,
+                    'fresh': self._fresh(source, now),
+                    'confirmed': feed['confirmed'],
+                    'ticks': feed['ticks'],
+                    'rejected': feed['rejected']
+                } for source, feed in self.feeds.items()}
+            }
+
+class SymbolState:
+    """Everything that belongs to one underlying. Nothing here is shared across symbols."""
+    
+    def __init__(self, symbol, config):
+        self.symbol = symbol
+        self.price = None
+        self.price_updated = None
+        self.price_source = None
+        self.arbiter = PriceArbiter(config['price_stale_seconds'], config['price_source_margin_ms'] / 1000.0,
+                                    config['price_max_deviation'])
+        self.tv_symbol = config['tv_symbols'].get(symbol, symbol)
+        self.option_chain = OptionChainCache()
+        self.validator = OrderValidator(self.option_chain, config, symbol)
+        self.strike_selector = StrikeSelector(self.option_chain, config['auto_strike_otm'])
+        self.contract_cache = {}
+        self.ladder_cache = {}
+        self.iv_surfaces = {}
+        # Expiries with a refresh queued or running, and when each was last attempted
+        self.iv_refresh_lock = threading.Lock()
+        self.iv_refreshing = set()
+        self.iv_refresh_attempts = {}
+    
+    def set_price(self, price, source=None):
+        self.price = price
+        self.price_source = source
+        self.price_updated = time.time()
+    
+    def summary(self):
+        return {
+            'symbol': self.symbol,
+            'tv_symbol': self.tv_symbol,
+            'price': round(self.price, 2) if self.price else None,
+            'price_updated': self.price_updated,
+            'price_source': self.price_source,
+            'chain_loaded': self.option_chain.loaded,
+            'suggestion': self.strike_selector.suggestion
+        }
+
+class OrderValidator:
+    """Local order checks against the cached chain and tick rules, run before IBKR sees the order."""
+    
+    EXPIRY_RE = re.compile(r'^(\d{4})-?(\d{2})-?(\d{2})$')
+    RIGHTS = {'C': 'C', 'CALL': 'C', 'P': 'P', 'PUT': 'P'}
+    
+    def __init__(self, chain, config, symbol):
+        self.chain = chain
+        self.symbol = symbol
+        self.tick_size = config['option_tick_size']
+        self.tick_size_above_3 = config['option_tick_size_above_3']
+    
+    def tick_for(self, price):
+        return self.tick_size if price < 3 else self.tick_size_above_3
+    
+    def validate(self, params):
+        """Returns (normalized_params, None) or (None, error_message)."""
+        contract, error = self.validate_contract(params)
+        if error:
+            return None, error
+        qty, error = self.validate_qty(params.get('qty', 1))
+        if error:
+            return None, error
+        
+        try:
+            price = float(params.get('price'))
+        except (TypeError, ValueError):
+            return None, f"Limit price must be a number (got {params.get('price')!r})"
+        if price <= 0:
+            return None, f"Limit price must be positive (got {price})"
+        tick = self.tick_for(price)
+        ticks = round(price / tick)
+        if abs(ticks * tick - price) > 1e-9:
+            low = int(price / tick) * tick
+            return None, f"Limit price ${price} is not a multiple of the ${tick:.2f} tick (nearest: ${low:.2f} or ${low + tick:.2f})"
+        price = round(ticks * tick, 2)
+        
+        normalized = dict(params)
+        normalized.update(contract, symbol=self.symbol, qty=qty, price=price)
+        return normalized, None
+    
+    def validate_combo(self, params):
+        """Combo order: 2-4 distinct legs, a BUY/SELL action and a net limit price (negative for a credit)."""
+        legs = params.get('legs')
+        if not isinstance(legs, list) or not 2 <= len(legs) <= 4:
+            return None, "A combo needs 2 to 4 legs"
+        normalized_legs, seen = [], set()
+        for i, leg in enumerate(legs, 1):
+            if not isinstance(leg, dict):
+                return None, f"Leg {i} must be an object"
+            contract, error = self.validate_contract(leg)
+            if error:
+                return None, f"Leg {i}: {error}"
+            action = str(leg.get('action', 'BUY')).strip().upper()
+            if action not in ('BUY', 'SELL'):
+                return None, f"Leg {i}: action must be BUY or SELL (got {leg.get('action')!r})"
+            ratio, error = self.validate_qty(leg.get('ratio', 1))
+            if error:
+                return None, f"Leg {i}: ratio must be a positive whole number (got {leg.get('ratio')!r})"
+            key = (contract['expiry'], contract['strike'], contract['type'])
+            if key in seen:
+                return None, f"Leg {i} repeats {contract['expiry']} ${contract['strike']:g}{contract['type']}"
+            seen.add(key)
+            normalized_legs.append(dict(contract, action=action, ratio=ratio))
+        
+        action = str(params.get('action', 'BUY')).strip().upper()
+        if action not in ('BUY', 'SELL'):
+            return None, f"Action must be BUY or SELL (got {params.get('action')!r})"
+        qty, error = self.validate_qty(params.get('qty', 1))
+        if error:
+            return None, error
+        try:
+            price = float(params.get('price'))
+        except (TypeError, ValueError):
+            return None, f"Net price must be a number (got {params.get('price')!r})"
+        # Combos trade in penny increments whatever the legs' tick sizes
+        if abs(round(price, 2) - price) > 1e-9 or price == 0:
+            return None, f"Net price must be a non-zero multiple of $0.01 (got {price})"
+        
+        normalized = dict(params)
+        normalized.update({'symbol': self.symbol, 'action': action, 'qty': qty, 'price': round(price, 2), 'legs': normalized_legs})
+        return normalized, None
+    
+    def validate_qty(self, value):
+        try:
+            qty = float(value)
+        except (TypeError, ValueError):
+            return None, f"Quantity must be a whole number (got {value!r})"
+        if qty != int(qty) or qty <= 0:
+            return None, f"Quantity must be a positive whole number (got {value!r})"
+        return int(qty), None
+    
+    def validate_contract(self, params):
+        """Type, expiry and strike of one option, checked against the cached chain. Returns (fields, None) or (None, error)."""
+        right = self.RIGHTS.get(str(params.get('type', 'C')).strip().upper())
+        if right is None:
+            return None, f"Option type must be C or P (got {params.get('type')!r})"
+        
+        match = self.EXPIRY_RE.match(str(params.get('expiry') or '').strip())
+        if not match:
+            return None, f"Expiry must be YYYYMMDD (got {params.get('expiry')!r})"
+        expiry = ''.join(match.groups())
+        try:
+            datetime.strptime(expiry, '%Y%m%d')
+        except ValueError:
+            return None, f"Expiry {expiry} is not a valid date"
+        if expiry < datetime.now(MARKET_TZ).strftime('%Y%m%d'):
+            return None, f"Expiry {expiry} is in the past"
+        
+        try:
+            strike = float(params.get('strike'))
+        except (TypeError, ValueError):
+            return None, f"Strike must be a number (got {params.get('strike')!r})"
+        if strike <= 0:
+            return None, f"Strike must be positive (got {strike})"
+        
+        chain = self.chain
+        if chain.loaded:
+            if expiry not in chain.expiration_set:
+                upcoming = chain.expirations[bisect.bisect_left(chain.expirations, expiry):][:3]
+                return None, f"Expiry {expiry} is not in the option chain (next: {', '.join(upcoming) or 'none'})"
+            if strike not in chain.strike_set:
+                nearest = ', '.join(f"${k:g}" for k in chain.nearest_strikes(strike, 1))
+                return None, f"Strike ${strike:g} is not listed (nearest: {nearest})"
+        
+        return {'type': right, 'expiry': expiry, 'strike': strike}, None
+
+class QuoteCache:
+    """Option quotes from reference-counted reqMktData lines, capped and evicted LRU.
+
+    Subscription changes run on the IB worker thread; quote reads from Flask
+    threads only touch the quotes dict.
+    """
+    
+    def __init__(self, max_lines):
+        self.max_lines = max_lines
+        self.lines = OrderedDict()
+        self.clients = {}
+        self.quotes = {}
+        self.by_con_id = {}
+        self.evictions = 0
+        self.mirrored = None
+    
+    def set_client_keys(self, client_id, keys):
+        """Replace a client's subscribed keys. Returns keys that still need a market data line."""
+        old = self.clients.get(client_id, set())
+        new = set(keys)
+        self.clients[client_id] = new
+        for key in old - new:
+            line = self.lines.get(key)
+            if line:
+                line['refs'].discard(client_id)
+        missing = []
+        for key in keys:
+            line = self.lines.get(key)
+            if line:
+                line['refs'].add(client_id)
+                self.lines.move_to_end(key)
+            else:
+                missing.append(key)
+        return missing
+    
+    def release_client(self, client_id):
+        for key in self.clients.pop(client_id, ()):
+            line = self.lines.get(key)
+            if line:
+                line['refs'].discard(client_id)
+    
+    def add_line(self, key, contract, ticker):
+        refs = {cid for cid, keys in self.clients.items() if key in keys}
+        self.lines[key] = {'contract': contract, 'ticker': ticker, 'refs': refs}
+        self.by_con_id[contract.conId] = key
+        self.quotes.setdefault(key, {'bid': None, 'ask': None, 'last': None, 'updated': None})
+    
+    def pop_evictions(self):
+        """Lines to cancel to get back under the cap: unreferenced LRU first, then LRU overall."""
+        evicted = []
+        while len(self.lines) > self.max_lines:
+            victim = next((k for k, line in self.lines.items() if not line['refs']), None)
+            if victim is None:
+                victim = next(iter(self.lines))
+            evicted.append(self._drop(victim))
+            self.evictions += 1
+        return evicted
+    
+    def _drop(self, key):
+        line = self.lines.pop(key)
+        self.by_con_id.pop(line['contract'].conId, None)
+        self.quotes.pop(key, None)
+        return line['contract']
+    
+    def on_ticker(self, ticker):
+        key = self.by_con_id.get(ticker.contract.conId)
+        if key is None:
+            return
+        clean = lambda v: v if v == v and v is not None and v > 0 else None
+        self.quotes[key] = {
+            'bid': clean(ticker.bid),
+            'ask': clean(ticker.ask),
+            'last': clean(ticker.last),
+            'updated': time.time()
+        }
+    
+    def resubscribe(self, subscribe):
+        """Re-request every line on a fresh connection, keeping refs and last quotes."""
+        for line in self.lines.values():
+            line['ticker'] = subscribe(line['contract'])
+        return len(self.lines)
+    
+    def clear(self):
+        contracts = [line['contract'] for line in self.lines.values()]
+        self.lines.clear()
+        self.by_con_id.clear()
+        self.quotes.clear()
+        return contracts
+    
+    def export(self):
+        """Quotes and counters as JSON-safe data for the split-mode mirror."""
+        return {'quotes': [[list(key), quote] for key, quote in list(self.quotes.items())], 'snapshot': self.snapshot()}
+    
+    def load(self, exported):
+        """Web role: replace the quotes and counters with the execution process's export."""
+        self.quotes = {tuple(key): quote for key, quote in exported['quotes']}
+        self.mirrored = exported['snapshot']
+    
+    def snapshot(self):
+        if self.mirrored is not None:
+            return self.mirrored
+        return {
+            'lines': len(self.lines),
+            'max_lines': self.max_lines,
+            'clients': len(self.clients),
+            'evictions': self.evictions
+        }
+
+class AlertPipeline:
+    """TradingView alerts parsed into trade intents and handed to the IB worker on a fast path.
+
+    Intents skip the regular command queue: the worker drains them before its
+    next command, collapsing duplicates that arrive in the same burst.
+    """
+    
+    ACTIONS = ('buy', 'cancel_all')
+    
+    # (field, coerce, required, default), compiled once
+    SCHEMA = (
+        ('action', lambda v: str(v).strip().lower(), True, None),
+        ('strike', lambda v: 'atm' if str(v).strip().lower() == 'atm' else float(v), False, 'atm'),
+        ('expiry', lambda v: str(v).strip().lower(), False, '0dte'),
+        ('type', lambda v: str(v).strip().upper(), False, 'C'),
+        ('qty', int, False, 1),
+        ('price', float, False, None),
+        ('symbol', lambda v: str(v).strip().upper(), False, None),
+        ('id', str, False, None),
+        ('passphrase', str, False, None)
+    )
+    
+    def __init__(self, risk, secret=None, dedup_seconds=2.0):
+        self.risk = risk
+        self.secret = secret
+        self.dedup_seconds = dedup_seconds
+        self.pending = deque()
+        self.recent = {}
+        self.recent_lock = threading.Lock()
+        self.latencies = deque(maxlen=1000)
+        self.counts = {'received': 0, 'accepted': 0, 'duplicates': 0, 'rejected': 0, 'placed': 0, 'failed': 0}
+    
+    def parse(self, payload):
+        """Returns (intent, None) or (None, error)."""
+        if not isinstance(payload, dict):
+            return None, 'Alert body must be a JSON object'
+        intent = {}
+        for field, coerce, required, default in self.SCHEMA:
+            value = payload.get(field)
+            if value is None or value == '':
+                if required:
+                    return None, f"Missing field '{field}'"
+                intent[field] = default
+                continue
+            try:
+                intent[field] = coerce(value)
+            except (TypeError, ValueError):
+                return None, f"Invalid {field}: {value!r}"
+        intent.pop('passphrase', None)
+        if intent['action'] not in self.ACTIONS:
+            return None, f"Unknown action {intent['action']!r} (expected one of {', '.join(self.ACTIONS)})"
+        if intent['action'] == 'buy' and intent['price'] is None:
+            return None, "Missing field 'price'"
+        return intent, None
+    
+    def authorize(self, payload):
+        """None when the payload carries the configured passphrase, else the reason to refuse it."""
+        if not self.secret:
+            return 'Webhook secret not configured'
+        passphrase = payload.get('passphrase') if isinstance(payload, dict) else None
+        if not hmac.compare_digest(str(passphrase or ''), str(self.secret)):
+            return 'Invalid passphrase'
+        return None
+    
+    def dedup_key(self, intent):
+        if intent.get('id'):
+            return ('id', intent['id'])
+        return (intent['action'], intent['symbol'], intent['strike'], intent['expiry'], intent['type'], intent['qty'], intent['price'])
+    
+    def is_duplicate(self, intent, now, remember=False):
+        """True if the same alert was accepted within dedup_seconds; remember=True claims it when it was not.
+        
+        Only accepted alerts are remembered, so a retry after a rejection goes through.
+        """
+        key = self.dedup_key(intent)
+        with self.recent_lock:
+            seen = self.recent.get(key)
+            if seen is not None and now - seen < self.dedup_seconds:
+                return True
+            if not remember:
+                return False
+            self.recent[key] = now
+            if len(self.recent) > 1000:
+                self.recent = {k: t for k, t in self.recent.items() if now - t < self.dedup_seconds}
+            return False
+    
+    def forget(self, intent):
+        """Drop an alert's dedup claim so a retry of a failed placement is accepted."""
+        with self.recent_lock:
+            self.recent.pop(self.dedup_key(intent), None)
+    
+    def drain(self):
+        """Everything pending, with same-burst duplicates collapsed."""
+        batch, keys = [], set()
+        while self.pending:
+            intent = self.pending.popleft()
+            key = self.dedup_key(intent)
+            if key in keys:
+                self.counts['duplicates'] += 1
+                # The webhook reserved risk for this one; give it back
+                if 'params' in intent:
+                    self.risk.release(intent['params'].get('_risk_token'))
+                continue
+            keys.add(key)
+            batch.append(intent)
+        return batch
+    
+    def record(self, intent, placed):
+        self.counts['placed' if placed else 'failed'] += 1
+        received = intent['t_received']
+        self.latencies.append({
+            'queued_us': (intent['t_queued'] - received) / 1000,
+            'dequeued_us': (intent['t_dequeued'] - received) / 1000,
+            'placed_us': (intent['t_done'] - received) / 1000 if placed else None
+        })
+    
+    def stats(self):
+        def percentiles(name):
+            values = sorted(l[name] for l in list(self.latencies) if l[name] is not None)
+            if not values:
+                return None
+            pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))], 1)
+            return {'p50': pick(0.5), 'p99': pick(0.99), 'max': round(values[-1], 1)}
+        return {
+            'counts': dict(self.counts),
+            'pending': len(self.pending),
+            'alert_to_queue_us': percentiles('queued_us'),
+            'alert_to_worker_us': percentiles('dequeued_us'),
+            'alert_to_place_order_us': percentiles('placed_us')
+        }
+
+class StateStore:
+    """Copy-on-write state shared by the IB worker threads and Flask threads.
+    
+    Every write builds a new read-only mapping and swaps the reference, so a
+    reader takes `snapshot` once and iterates it without locks while writers
+    carry on. Writers are serialized among themselves only.
+    """
+    
+    def __init__(self, **fields):
+        self._write_lock = threading.Lock()
+        self.version = 0
+        self.snapshot = MappingProxyType({k: self._freeze(v) for k, v in fields.items()})
+    
+    @staticmethod
+    def _freeze(value):
+        return MappingProxyType(dict(value)) if isinstance(value, dict) else value
+    
+    def _commit(self, mutate):
+        """Apply mutate(state_copy) -> changes under the writer lock and swap."""
+        with self._write_lock:
+            state = dict(self.snapshot)
+            changes = mutate(state)
+            if not changes:
+                return
+            state.update({k: self._freeze(v) for k, v in changes.items()})
+            self.snapshot = MappingProxyType(state)
+            self.version += 1
+    
+    def update(self, **changes):
+        self._commit(lambda state: changes)
+    
+    def set_item(self, field, key, value):
+        def mutate(state):
+            items = dict(state[field])
+            items[key] = value
+            return {field: items}
+        self._commit(mutate)
+    
+    def pop_item(self, field, key):
+        found = []
+        def mutate(state):
+            items = dict(state[field])
+            if key in items:
+                found.append(items.pop(key))
+                return {field: items}
+        self._commit(mutate)
+        return found[0] if found else None
+
+class StoreField:
+    """Attribute backed by a StateStore field; assignment publishes a new snapshot."""
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj.state.snapshot[self.name]
+    
+    def __set__(self, obj, value):
+        obj.state.update(**{self.name: value})
+
+class SimulatedBroker:
+    """In-process stand-in for ib_insync.IB covering the calls the suite makes.
+    
+    Orders are acknowledged after sim_ack_latency_ms, filled at their limit in
+    chunks of sim_partial_fill_ratio every sim_fill_latency_ms, or rejected
+    with probability sim_reject_rate. Like IB, events are delivered on the
+    calling worker thread whenever it enters the broker (sleep(0) on idle ticks).
+    """
+    
+    ACCOUNT = 'SIM0001'
+    
+    def __init__(self, config, spot=None):
+        # spot(symbol) -> underlying price or None; prices combo legs with Black-Scholes
+        self.spot = spot or (lambda symbol: None)
+        self.rate = config['risk_free_rate']
+        self.iv = config['default_iv']
+        self.ack_latency = config['sim_ack_latency_ms'] / 1000.0
+        self.fill_latency = config['sim_fill_latency_ms'] / 1000.0
+        self.partial_ratio = config['sim_partial_fill_ratio']
+        self.reject_rate = config['sim_reject_rate']
+        self.commission = config['sim_commission_per_contract']
+        self.cash = config['sim_account_cash']
+        self.random = random.Random(config['sim_seed'])
+        self.connected = False
+        self.client_id = 0
+        self.next_order_id = 1
+        self.next_exec_id = 0
+        self.timers = []
+        self.timer_seq = 0
+        self._trades = {}
+        self._fills = []
+        self.contracts = {}
+        for name in ('execDetailsEvent', 'commissionReportEvent', 'pendingTickersEvent', 'orderStatusEvent',
+                     'accountValueEvent', 'accountSummaryEvent', 'updatePortfolioEvent', 'disconnectedEvent'):
+            setattr(self, name, ib_api().Event(name))
+    
+    # Connection and event loop
+    def connect(self, host, port, clientId=0, timeout=None):
+        self.connected = True
+        self.client_id = clientId
+        return self
+    
+    def disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.disconnectedEvent.emit()
+    
+    def isConnected(self):
+        return self.connected
+    
+    def _at(self, delay, callback, *args):
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (time.monotonic() + delay, self.timer_seq, callback, args))
+    
+    def next_deadline(self):
+        """Monotonic time of the next pending ack/fill, or None; the worker wakes for it."""
+        return self.timers[0][0] if self.timers else None
+    
+    def _pump(self):
+        now = time.monotonic()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self.timers)
+            callback(*args)
+    
+    def sleep(self, seconds=0):
+        deadline = time.monotonic() + seconds
+        while True:
+            self._pump()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, self.timers[0][0] - time.monotonic() if self.timers else remaining, 0.01))
+    
+    def run(self, awaitable):
+        return asyncio.get_event_loop().run_until_complete(awaitable)
+    
+    async def reqCurrentTimeAsync(self):
+        self._pump()
+        return datetime.now(MARKET_TZ)
+    
+    # Reference data
+    def qualifyContracts(self, *contracts):
+        for contract in contracts:
+            if not contract.conId:
+                key = f"{contract.secType}:{contract.symbol}:{contract.lastTradeDateOrContractMonth}:{contract.strike}:{contract.right}"
+                contract.conId = zlib.crc32(key.encode()) & 0x7fffffff
+            if contract.secType == 'OPT':
+                contract.multiplier = contract.multiplier or '100'
+                contract.localSymbol = contract.localSymbol or \
+                    f"{contract.symbol} {contract.lastTradeDateOrContractMonth[2:]}{contract.right}{int(contract.strike * 1000):08d}"
+            contract.exchange = contract.exchange or 'SMART'
+            contract.currency = contract.currency or 'USD'
+            self.contracts[contract.conId] = contract
+        return list(contracts)
+    
+    def reqSecDefOptParams(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        today = datetime.now(MARKET_TZ).date()
+        expirations = [(today + timedelta(days=d)).strftime('%Y%m%d') for d in range(45)
+                       if (today + timedelta(days=d)).weekday() < 5]
+        strikes = [float(k) for k in range(1, 1001)]
+        return [ib_api().OptionChain('SMART', underlyingConId, underlyingSymbol, '100', expirations, strikes)]
+    
+    # Market data: lines are accepted but carry no prices
+    def reqMarketDataType(self, marketDataType):
+        pass
+    
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False):
+        return ib_api().Ticker(contract=contract)
+    
+    def cancelMktData(self, contract):
+        pass
+    
+    def reqTickers(self, *contracts):
+        return [ib_api().Ticker(contract=c) for c in contracts]
+    
+    # Account
+    def reqAccountSummary(self):
+        pass
+    
+    def accountValues(self):
+        ib = ib_api()
+        return [ib.AccountValue(self.ACCOUNT, 'NetLiquidation', str(self.cash), 'USD', ''),
+                ib.AccountValue(self.ACCOUNT, 'AvailableFunds', str(self.cash), 'USD', '')]
+    
+    def accountSummary(self):
+        return []
+    
+    def portfolio(self):
+        return []
+    
+    # Orders
+    def placeOrder(self, contract, order):
+        self._pump()
+        order.orderId = order.orderId or self.next_order_id
+        order.clientId = self.client_id
+        self.next_order_id = max(self.next_order_id, order.orderId + 1)
+        ib = ib_api()
+        trade = ib.Trade(contract, order, ib.OrderStatus(orderId=order.orderId, status='PendingSubmit',
+                                                         remaining=order.totalQuantity))
+        trade.log.append(ib.TradeLogEntry(datetime.now(MARKET_TZ), 'PendingSubmit', ''))
+        self._trades[order.orderId] = trade
+        self._at(self.ack_latency, self._ack, trade)
+        return trade
+    
+    def _set_status(self, trade, status, message=''):
+        trade.orderStatus.status = status
+        trade.log.append(ib_api().TradeLogEntry(datetime.now(MARKET_TZ), status, message))
+        self.orderStatusEvent.emit(trade)
+    
+    def _ack(self, trade):
+        if trade.orderStatus.status != 'PendingSubmit':
+            return
+        if self.random.random() < self.reject_rate:
+            self._set_status(trade, 'Inactive', 'Simulated rejection')
+            return
+        self._set_status(trade, 'Submitted')
+        self._at(self.fill_latency, self._fill, trade)
+    
+    def _fill(self, trade):
+        status = trade.orderStatus
+        if status.status not in ('Submitted', 'PreSubmitted') or status.remaining <= 0:
+            return
+        order = trade.order
+        chunk = min(status.remaining, max(1, math.ceil(order.totalQuantity * self.partial_ratio)))
+        now = datetime.now(MARKET_TZ)
+        ib = ib_api()
+        fills = []
+        for contract, action, shares, price in self._executions(trade, chunk):
+            self.next_exec_id += 1
+            execution = ib.Execution(execId=f'sim.{self.next_exec_id}', time=now, acctNumber=self.ACCOUNT, exchange='SMART',
+                                     side='BOT' if action == 'BUY' else 'SLD', shares=shares, price=price,
+                                     orderId=order.orderId, clientId=order.clientId,
+                                     cumQty=(status.filled + chunk) * shares / chunk, avgPrice=price)
+            report = ib.CommissionReport(execId=execution.execId, commission=self.commission * shares, currency='USD')
+            fills.append((ib.Fill(contract, execution, report, now), report))
+        status.filled += chunk
+        status.remaining -= chunk
+        status.avgFillPrice = order.lmtPrice
+        status.lastFillPrice = order.lmtPrice
+        for fill, report in fills:
+            trade.fills.append(fill)
+            self._fills.append(fill)
+            self.execDetailsEvent.emit(trade, fill)
+            self.commissionReportEvent.emit(trade, fill, report)
+        if status.remaining <= 0:
+            self._set_status(trade, 'Filled')
+        else:
+            self.orderStatusEvent.emit(trade)
+            self._at(self.fill_latency, self._fill, trade)
+    
+    def _executions(self, trade, chunk):
+        """(contract, action, shares, price) per fill; a BAG fills every leg at once."""
+        order, contract = trade.order, trade.contract
+        if contract.secType != 'BAG':
+            return [(contract, order.action, chunk, order.lmtPrice)]
+        flip = {'BUY': 'SELL', 'SELL': 'BUY'}
+        legs = [(self.contracts[leg.conId], leg.action if order.action == 'BUY' else flip[leg.action], leg.ratio)
+                for leg in contract.comboLegs]
+        prices = self._leg_prices(contract, order.lmtPrice)
+        return [(leg, action, chunk * ratio, price) for (leg, action, ratio), price in zip(legs, prices)]
+    
+    def _leg_prices(self, bag, net):
+        """Non-negative per-leg fill prices whose signed, ratio-weighted sum is the combo's net price.
+        
+        Legs are priced with Black-Scholes at the current spot and the net's
+        difference from the model is spread over them in proportion to value.
+        Whatever cannot be spread without a negative price goes on one leg on
+        the side of the residual, which is all that is possible without a spot.
+        """
+        legs = [(self.contracts[leg.conId], 1 if leg.action == 'BUY' else -1, leg.ratio) for leg in bag.comboLegs]
+        spot = self.spot(bag.symbol)
+        values = [float(bs_price(spot, c.strike, years_to_expiry(c.lastTradeDateOrContractMonth), self.rate, self.iv, c.right))
+                  if spot else 0.0 for c, _, _ in legs]
+        total = sum(ratio * value for (_, _, ratio), value in zip(legs, values))
+        if total > 0:
+            residual = net - sum(sign * ratio * value for (_, sign, ratio), value in zip(legs, values))
+            prices = [max(value * (1 + sign * residual / total), 0.0) for (_, sign, _), value in zip(legs, values)]
+        else:
+            prices = [0.0] * len(legs)
+        residual = net - sum(sign * ratio * price for (_, sign, ratio), price in zip(legs, prices))
+        if abs(residual) > 1e-9:
+            i = next((i for i, (_, sign, _) in enumerate(legs) if sign * residual > 0), 0)
+            prices[i] += abs(residual) / legs[i][2]
+        return [round(price, 6) for price in prices]
+    
+    def cancelOrder(self, order):
+        self._pump()
+        trade = self._trades.get(order.orderId)
+        if trade and trade.orderStatus.status in ('PendingSubmit', 'PreSubmitted', 'Submitted'):
+            self._at(self.ack_latency, self._set_status, trade, 'Cancelled')
+        return trade
+    
+    def openTrades(self):
+        return [t for t in self._trades.values() if t.orderStatus.status in ('PendingSubmit', 'PreSubmitted', 'Submitted')]
+    
+    def trades(self):
+        return list(self._trades.values())
+    
+    def fills(self):
+        return list(self._fills)
+
+class Scheduler:
+    """Heap of timed jobs fired by the order worker on the monotonic clock.
+    
+    Wall-clock targets (ET) are converted to monotonic deadlines when a job is
+    (re)armed. The worker sleeps on its queue until just before the next
+    deadline, then spins for the last SPIN seconds, so firing jitter is
+    bounded by the spin rather than by the queue timeout.
+    """
+    
+    JOB_TYPES = ('trade', 'cancel_all', 'refresh_chain', 'warmup')
+    SPIN = 0.002
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []
+        self.jobs = {}
+        self.next_id = 0
+        self.jitter = deque(maxlen=1000)
+    
+    @staticmethod
+    def parse_clock(text):
+        parts = str(text).split(':')
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Time must be HH:MM[:SS.fff] ET, got {text}")
+        h, m, sec = int(parts[0]), int(parts[1]), float(parts[2]) if len(parts) == 3 else 0.0
+        if not (0 <= h < 24 and 0 <= m < 60 and 0 <= sec < 60):
+            raise ValueError(f"Time out of range: {text}")
+        return h, m, sec
+    
+    @classmethod
+    def next_daily(cls, clock, after=None):
+        """Epoch seconds of the next weekday occurrence of an ET wall-clock time."""
+        h, m, sec = cls.parse_clock(clock)
+        now = datetime.fromtimestamp(after or time.time(), MARKET_TZ)
+        target = now.replace(hour=h, minute=m, second=int(sec), microsecond=int(round(sec % 1 * 1e6)))
+        while target <= now or target.weekday() >= 5:
+            target = (target + timedelta(days=1)).replace(hour=h, minute=m, second=int(sec),
+                                                        microsecond=int(round(sec % 1 * 1e6)))
+        return target.timestamp()
+    
+    def _arm(self, job):
+        job['due'] = time.monotonic() + (job['at'] - time.time())
+        heapq.heappush(self.heap, (job['due'], job['id']))
+    
+    def add(self, job_type, at, params=None, daily=None, every=None, name=None):
+        """Schedule a job at epoch seconds `at`; daily=HH:MM:SS or every=seconds makes it recurring."""
+        with self.lock:
+            self.next_id += 1
+            job = {'id': self.next_id, 'type': job_type, 'name': name or job_type, 'params': params or {},
+                   'at': at, 'daily': daily, 'every': every, 'status': 'scheduled', 'runs': 0,
+                   'last_run': None, 'last_jitter_ms': None, 'last_error': None}
+            self.jobs[job['id']] = job
+            self._arm(job)
+            return job
+    
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job and job['status'] == 'scheduled':
+                job['status'] = 'cancelled'
+                return True
+            return False
+    
+    def next_due(self):
+        """Monotonic deadline of the earliest live job, or None."""
+        with self.lock:
+            while self.heap and self.jobs[self.heap[0][1]]['status'] != 'scheduled':
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+    
+    def pop_due(self):
+        """Wait out the last SPIN seconds of the next deadline, then return every job that is due."""
+        due = self.next_due()
+        if due is None or due - time.monotonic() > self.SPIN:
+            return []
+        while time.monotonic() < due:
+            pass
+        fired = []
+        with self.lock:
+            now = time.monotonic()
+            while self.heap and self.heap[0][0] <= now:
+                _, job_id = heapq.heappop(self.heap)
+                job = self.jobs[job_id]
+                if job['status'] != 'scheduled' or job['due'] > now:
+                    continue
+                jitter = (now - job['due']) * 1000
+                self.jitter.append(jitter)
+                job['last_jitter_ms'] = round(jitter, 3)
+                job['runs'] += 1
+                job['last_run'] = time.time()
+                fired.append(job)
+                if job['daily']:
+                    job['at'] = self.next_daily(job['daily'], max(job['at'], time.time()))
+                    self._arm(job)
+                elif job['every']:
+                    # A late job runs once and skips to the next slot after now, rather than catching up in a burst
+                    missed = math.floor((time.time() - job['at']) / job['every'])
+                    job['at'] += (max(missed, 0) + 1) * job['every']
+                    self._arm(job)
+                else:
+                    job['status'] = 'done'
+        return fired
+    
+    def snapshot(self):
+        with self.lock:
+            jitter = np.array(self.jitter) if self.jitter else None
+            return {
+                'jobs': [{k: v for k, v in job.items() if k != 'due'} for job in self.jobs.values()],
+                'jitter_ms': None if jitter is None else {
+                    'count': len(jitter),
+                    'p50': round(float(np.percentile(jitter, 50)), 3),
+                    'p99': round(float(np.percentile(jitter, 99)), 3),
+                    'max': round(float(jitter.max()), 3)
+                }
+            }
+
+class PoolMember:
+    """One IB connection in the pool: its own client ID, thread, event loop and command queue."""
+    
+    def __init__(self, name, roles, client_offset, command_queue=None):
+        self.name = name
+        self.roles = roles
+        self.client_offset = client_offset
+        self.queue = command_queue or queue.Queue()
+        self.ib = None
+        self.last_error = None
+        self.commands = 0
+        self.errors = 0
+        self.busy_since = None
+        self.current = None
+        self.last_command_at = None
+        self.last_probe = 0.0
+        self.reconnect_at = None
+        self.reconnect_delay = 0.0
+    
+    def begin(self, command):
+        self.current = command
+        self.busy_since = time.monotonic()
+    
+    def end(self):
+        if self.current is not None:
+            self.commands += 1
+            self.last_command_at = time.time()
+        self.current = None
+        self.busy_since = None
+    
+    def connected(self):
+        return bool(self.ib and self.ib.isConnected())
+    
+    def health(self):
+        busy_for = time.monotonic() - self.busy_since if self.busy_since else 0.0
+        return {
+            'name': self.name,
+            'roles': sorted(self.roles),
+            'client_offset': self.client_offset,
+            'connected': self.connected(),
+            'queue_depth': self.queue.qsize(),
+            'current_command': self.current,
+            'busy_seconds': round(busy_for, 3),
+            'commands': self.commands,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_command_at': self.last_command_at,
+            'reconnecting': self.reconnect_at is not None
+        }
+
+class ColumnLog:
+    """Append-only fixed-width columns, one raw file per column, read back through mmap.
+    
+    Rows are buffered and appended column by column; readers map each file and
+    trim to the shortest column, so a half-written flush is never visible. A
+    writer cuts every column back to the shortest on open, so rows appended
+    after a torn flush line up again. Read-only logs never touch the disk.
+    """
+    
+    def __init__(self, directory, schema, writable=True):
+        self.directory = Path(directory)
+        self.schema = schema
+        self.buffer = []
+        if writable:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._truncate_torn()
+    
+    def _sizes(self):
+        sizes = {}
+        for name, dtype in self.schema:
+            path = self.directory / f'{name}.col'
+            sizes[name] = path.stat().st_size // np.dtype(dtype).itemsize if path.exists() else 0
+        return sizes
+    
+    def _truncate_torn(self):
+        rows = min(self._sizes().values())
+        for name, dtype in self.schema:
+            path = self.directory / f'{name}.col'
+            if path.exists() and path.stat().st_size != rows * np.dtype(dtype).itemsize:
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+    
+    def append(self, row):
+        self.buffer.append(row)
+    
+    def flush(self):
+        if not self.buffer:
+            return 0
+        rows, self.buffer = self.buffer, []
+        for (name, dtype), values in zip(self.schema, zip(*rows)):
+            with open(self.directory / f'{name}.col', 'ab') as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+        return len(rows)
+    
+    def columns(self):
+        """Read-only memory maps of every column, trimmed to the common length."""
+        rows = min(self._sizes().values())
+        if rows == 0:
+            return {name: np.empty(0, dtype) for name, dtype in self.schema}
+        return {name: np.memmap(self.directory / f'{name}.col', dtype=dtype, mode='r', shape=(rows,))
+                for name, dtype in self.schema}
+
+class TickStore:
+    """Date-partitioned columnar store for prices and order events under ~/.spy_trading_suite/data.
+    
+    Layout: <root>/<YYYYMMDD>/<stream>/<SYMBOL>/<column>.col. Timestamps are
+    int64 epoch nanoseconds and are appended in order, so range queries are a
+    binary search plus zero-copy slices of the mapped columns.
+    """
+    
+    SCHEMAS = {
+        'ticks': (('ts', '<i8'), ('price', '<f8')),
+        'orders': (('ts', '<i8'), ('order_id', '<i8'), ('event', 'u1'), ('status', 'u1'), ('side', 'i1'),
+                   ('qty', '<f8'), ('price', '<f8'), ('strike', '<f8'), ('right', 'S1'), ('expiry', '<i4'))
+    }
+    ORDER_EVENTS = ('placed', 'status', 'fill', 'cancel')
+    ORDER_STATUSES = ('', 'PendingSubmit', 'PreSubmitted', 'Submitted', 'ApiPending', 'PendingCancel',
+                      'ApiCancelled', 'Cancelled', 'Filled', 'Inactive')
+    
+    def __init__(self, root, flush_rows):
+        self.root = Path(root).expanduser()
+        self.flush_rows = flush_rows
+        self.lock = threading.Lock()
+        self.logs = {}
+        self.rows = 0
+    
+    def _log(self, date, stream, symbol):
+        key = (date, stream, symbol)
+        log = self.logs.get(key)
+        if log is None:
+            log = self.logs[key] = ColumnLog(self.root / date / stream / symbol, self.SCHEMAS[stream])
+        return log
+    
+    def _append(self, stream, symbol, ts, fields):
+        with self.lock:
+            # Stamped under the lock so rows land in timestamp order
+            ts = ts or time.time_ns()
+            date = datetime.fromtimestamp(ts / 1e9, MARKET_TZ).strftime('%Y%m%d')
+            log = self._log(date, stream, symbol)
+            log.append((ts,) + fields)
+            self.rows += 1
+            if len(log.buffer) >= self.flush_rows:
+                log.flush()
+    
+    def append_tick(self, symbol, price, ts=None):
+        self._append('ticks', symbol, ts, (price,))
+    
+    def append_order_event(self, symbol, event, order_id, side=0, qty=0, price=0.0, strike=0.0, right='', expiry=0,
+                           status='', ts=None):
+        status_code = self.ORDER_STATUSES.index(status) if status in self.ORDER_STATUSES else 0
+        self._append('orders', symbol, ts, (order_id or 0, self.ORDER_EVENTS.index(event), status_code,
+                                            side, qty or 0, price or 0.0, strike or 0.0, (right or '').encode(), int(expiry or 0)))
+    
+    def flush(self):
+        with self.lock:
+            return sum(log.flush() for log in self.logs.values())
+    
+    def dates(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+    
+    def symbols(self, date, stream):
+        path = self.root / date / stream
+        return sorted(p.name for p in path.iterdir() if p.is_dir()) if path.exists() else []
+    
+    def iter_chunks(self, stream, symbol, date, chunk_rows):
+        """Successive column-slice dicts over a partition; only one chunk is ever materialized."""
+        columns = self.query(stream, symbol, date)
+        for start in range(0, len(columns['ts']), chunk_rows):
+            yield {name: column[start:start + chunk_rows] for name, column in columns.items()}
+    
+    def query(self, stream, symbol, date, start_ns=None, end_ns=None):
+        """Column views for [start_ns, end_ns) of one partition; pending rows are flushed first.
+        
+        Reading never creates a partition: an unknown one comes back as empty columns.
+        """
+        with self.lock:
+            log = self.logs.get((date, stream, symbol))
+            if log is not None:
+                log.flush()
+        if log is None:
+            log = ColumnLog(self.root / date / stream / symbol, self.SCHEMAS[stream], writable=False)
+        columns = log.columns()
+        ts = columns['ts']
+        lo = int(np.searchsorted(ts, start_ns, 'left')) if start_ns is not None else 0
+        hi = int(np.searchsorted(ts, end_ns, 'left')) if end_ns is not None else len(ts)
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+class SimulatedFillModel:
+    """Fills replayed limit buys against Black-Scholes model prices and exits on TP/SL.
+    
+    A buy fills at its limit once the model price at the current underlying is
+    at or below it (after fill_latency). TP/SL are underlying offsets from the
+    spot at fill, as on the dashboard; exits are at the model price.
+    """
+    
+    def __init__(self, rate, iv, multiplier, fill_latency_ns=0, take_profit=None, stop_loss=None):
+        self.rate = rate
+        self.iv = iv
+        self.multiplier = multiplier
+        self.fill_latency_ns = fill_latency_ns
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.working = []
+        self.positions = []
+        self.fills = []
+        self.realized = 0.0
+        self.next_id = 0
+    
+    def model_price(self, order, ts, spot):
+        t = max(order['close_ts'] - ts / 1e9, 60.0) / (365.0 * 24 * 3600)
+        return float(bs_price(spot, order['strike'], t, self.rate, self.iv, order['type']))
+    
+    def submit(self, order, ts):
+        self.next_id += 1
+        close = datetime.strptime(order['expiry'], '%Y%m%d').replace(hour=16, tzinfo=MARKET_TZ)
+        self.working.append(dict(order, order_id=self.next_id, submitted=ts, active_at=ts + self.fill_latency_ns,
+                                 close_ts=close.timestamp()))
+        return self.next_id
+    
+    def _fill(self, order, ts, spot, side, price):
+        fill = {'order_id': order['order_id'], 'ts': ts, 'side': side, 'qty': order['qty'], 'price': round(price, 4),
+                'spot': spot, 'strike': order['strike'], 'expiry': order['expiry'], 'type': order['type']}
+        self.fills.append(fill)
+        return fill
+    
+    def on_tick(self, ts, spot):
+        still_working = []
+        for order in self.working:
+            if ts >= order['active_at'] and self.model_price(order, ts, spot) <= order['price']:
+                self._fill(order, ts, spot, 'BOT', order['price'])
+                self.positions.append(dict(order, entry=order['price'], entry_spot=spot, mark=order['price']))
+            else:
+                still_working.append(order)
+        self.working = still_working
+        
+        open_positions = []
+        for pos in self.positions:
+            pos['mark'] = self.model_price(pos, ts, spot)
+            move = (spot - pos['entry_spot']) * (1 if pos['type'] == 'C' else -1)
+            if (self.take_profit is not None and move >= self.take_profit) or \
+               (self.stop_loss is not None and move <= -self.stop_loss):
+                self._fill(pos, ts, spot, 'SLD', pos['mark'])
+                self.realized += (pos['mark'] - pos['entry']) * pos['qty'] * self.multiplier
+            else:
+                open_positions.append(pos)
+        self.positions = open_positions
+    
+    def report(self):
+        unrealized = sum((p['mark'] - p['entry']) * p['qty'] * self.multiplier for p in self.positions)
+        return {
+            'fills': self.fills,
+            'working': len(self.working),
+            'open_positions': [{k: p[k] for k in ('order_id', 'strike', 'expiry', 'type', 'qty', 'entry', 'mark')}
+                               for p in self.positions],
+            'realized_pnl': round(self.realized, 2),
+            'unrealized_pnl': round(unrealized, 2),
+            'total_pnl': round(self.realized + unrealized, 2)
+        }
+
+class ReplayEngine:
+    """Streams a recorded session through the suite's price-ingest path into a SimulatedFillModel.
+    
+    Uses its own SymbolState (sharing the live chain) so a replay never moves
+    the live price, suggestion or orders. speed 0 runs as fast as possible;
+    otherwise recorded gaps are slept through divided by speed.
+    """
+    
+    def __init__(self, suite, symbol, date, speed, orders, fill_model):
+        self.suite = suite
+        self.symbol = symbol
+        self.date = date
+        self.speed = speed
+        self.fill_model = fill_model
+        self.state = SymbolState(symbol, suite.config)
+        live_chain = suite.symbols[symbol].option_chain
+        if live_chain.loaded:
+            self.state.option_chain.update(live_chain.expirations, live_chain.strikes, live_chain.exchange)
+        self.orders = sorted(orders, key=lambda o: o['ts'])
+        self.status = 'pending'
+        self.error = None
+        self.ticks = 0
+        self.total_ticks = 0
+        self.costs = None
+        self.started = None
+        self.finished = None
+    
+    def _strike_for(self, order, spot):
+        if order['strike'] != 'atm':
+            return float(order['strike'])
+        strikes = self.state.option_chain.strikes
+        if strikes:
+            return min(strikes, key=lambda k: abs(k - spot))
+        return float(round(spot))
+    
+    def run(self):
+        self.status = 'running'
+        self.started = time.perf_counter()
+        try:
+            columns = self.suite.store.query('ticks', self.symbol, self.date)
+            ts_col, price_col = columns['ts'], columns['price']
+            self.total_ticks = len(ts_col)
+            self.costs = np.zeros(self.total_ticks, dtype=np.int64)
+            orders, o = self.orders, 0
+            model = self.fill_model
+            previous_ts = None
+            
+            for i in range(self.total_ticks):
+                ts, spot = int(ts_col[i]), float(price_col[i])
+                if self.speed and previous_ts is not None:
+                    time.sleep(max(ts - previous_ts, 0) / 1e9 / self.speed)
+                previous_ts = ts
+                
+                start = time.perf_counter_ns()
+                self.suite.ingest_price(self.state, spot, record=False, qualify=False)
+                while o < len(orders) and orders[o]['ts'] <= ts:
+                    order = dict(orders[o], strike=self._strike_for(orders[o], spot))
+                    model.submit(order, ts)
+                    o += 1
+                model.on_tick(ts, spot)
+                self.costs[i] = time.perf_counter_ns() - start
+                self.ticks = i + 1
+            self.status = 'done'
+        except Exception as e:
+            self.status = 'error'
+            self.error = str(e)
+        self.finished = time.perf_counter()
+    
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        report = {
+            'symbol': self.symbol,
+            'date': self.date,
+            'speed': self.speed,
+            'status': self.status,
+            'error': self.error,
+            'ticks': self.ticks,
+            'total_ticks': self.total_ticks,
+            'elapsed_seconds': round(elapsed, 4),
+            'ticks_per_second': round(self.ticks / elapsed) if elapsed else None,
+            'suggestion': self.state.strike_selector.suggestion
+        }
+        if self.ticks:
+            costs = self.costs[:self.ticks]
+            report['tick_cost_us'] = {
+                'mean': round(float(costs.mean()) / 1e3, 2),
+                'p50': round(float(np.percentile(costs, 50)) / 1e3, 2),
+                'p99': round(float(np.percentile(costs, 99)) / 1e3, 2),
+                'max': round(float(costs.max()) / 1e3, 2)
+            }
+        report.update(self.fill_model.report())
+        return report
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over every thread, via sys._current_frames().
+    
+    Samples are aggregated as collapsed stacks ("thread;outer;...;inner count"),
+    the input format of flamegraph.pl, speedscope and most flame graph viewers.
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+    
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+    
+    def run(self, seconds):
+        me = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(self._frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f'thread-{ident}'))
+                self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        return self
+    
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+    
+    def summary(self, limit):
+        """Per-thread sample counts and the hottest leaf (self time) and inclusive frames."""
+        threads, leaf, inclusive = Counter(), Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            threads[frames[0]] += count
+            if len(frames) > 1:
+                leaf[frames[-1]] += count
+            for frame in set(frames[1:]):
+                inclusive[frame] += count
+        return {
+            'samples': self.samples,
+            'interval': self.interval,
+            'threads': dict(threads.most_common()),
+            'top_self': leaf.most_common(limit),
+            'top_inclusive': inclusive.most_common(limit)
+        }
+
+class StaticAssets:
+    """The dashboard split into a small HTML shell plus CSS/JS assets, compressed and hashed once.
+    
+    Assets are served under content-hashed names with a year-long immutable
+    cache; the shell is revalidated by ETag so a reload is a 304.
+    """
+    
+    # Third-party scripts that can be served from a local vendor directory
+    VENDOR_SCRIPTS = {
+        'https://cdn.tailwindcss.com': 'tailwind.js',
+        'https://s3.tradingview.com/tv.js': 'tv.js'
+    }
+    
+    def __init__(self, html, vendor_dir=None):
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        self.brotli = brotli
+        self.assets = {}
+        
+        head, _, rest = html.partition('<style>')
+        css, _, rest = rest.partition('</style>')
+        body, _, script = rest.rpartition('<script>')
+        js, _, tail = script.rpartition('</script>')
+        
+        css_name = self.add('app', 'css', css, 'text/css; charset=utf-8')
+        js_name = self.add('app', 'js', js, 'application/javascript; charset=utf-8')
+        shell = (head + f'<link rel="stylesheet" href="/assets/{css_name}">' + body +
+                 f'<script src="/assets/{js_name}"></script>' + tail)
+        
+        self.vendored = []
+        if vendor_dir:
+            for url, filename in self.VENDOR_SCRIPTS.items():
+                path = Path(vendor_dir).expanduser() / filename
+                if path.is_file():
+                    name = self.add(f'vendor/{path.stem}', 'js', path.read_bytes(), 'application/javascript; charset=utf-8')
+                    shell = shell.replace(f'src="{url}"', f'src="/assets/{name}"')
+                    self.vendored.append(filename)
+        self.index = self._build(shell, 'text/html; charset=utf-8')
+    
+    def _build(self, content, mimetype):
+        data = content.encode() if isinstance(content, str) else content
+        smaller = lambda packed: packed if len(packed) < len(data) else None
+        return {
+            'identity': data,
+            'gzip': smaller(gzip.compress(data, 9)),
+            'br': smaller(self.brotli.compress(data)) if self.brotli else None,
+            'etag': hashlib.sha256(data).hexdigest()[:16],
+            'mimetype': mimetype
+        }
+    
+    def add(self, stem, ext, content, mimetype):
+        asset = self._build(content, mimetype)
+        name = f"{stem}.{asset['etag']}.{ext}"
+        self.assets[name] = asset
+        return name
+    
+    def respond(self, app, asset, immutable):
+        etag = f'"{asset["etag"]}"'
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'public, max-age=31536000, immutable' if immutable else 'no-cache'
+        }
+        if etag in request.headers.get('If-None-Match', ''):
+            return app.response_class(status=304, headers=headers)
+        
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = next((e for e in ('br', 'gzip') if asset[e] and e in accepted), 'identity')
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return app.response_class(asset[encoding], mimetype=asset['mimetype'], headers=headers)
+
+class SharedStateBlock:
+    """Shared memory between the web and execution processes.
+    
+    Layout: a seqlock-guarded snapshot slot (sequence, length, JSON payload)
+    written by the execution process. Readers never block the writer; they
+    retry when the sequence changes under them.
+    """
+    
+    HEADER = struct.Struct('<QI4x')
+    
+    def __init__(self, size=None, name=None):
+        self.payload_offset = self.HEADER.size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.payload_offset + size)
+            self.shm.buf[:self.payload_offset] = bytes(self.payload_offset)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.capacity = len(self.buf) - self.payload_offset
+        self.seq = 0
+        self.last_seq = None
+        self.last_payload = None
+    
+    def publish(self, payload):
+        if len(payload) > self.capacity:
+            raise ValueError(f"Snapshot of {len(payload)} bytes exceeds shared block ({self.capacity})")
+        self.seq += 1
+        # Odd sequence, then the body, then the even sequence on its own so it lands last
+        self.HEADER.pack_into(self.buf, 0, self.seq * 2 - 1, len(payload))
+        self.buf[self.payload_offset:self.payload_offset + len(payload)] = payload
+        struct.pack_into('<Q', self.buf, 0, self.seq * 2)
+    
+    def read(self):
+        """Latest consistent snapshot bytes, or None before the first publish."""
+        while True:
+            seq, length = self.HEADER.unpack_from(self.buf, 0)
+            if seq == self.last_seq:
+                return self.last_payload
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            payload = bytes(self.buf[self.payload_offset:self.payload_offset + length])
+            if self.HEADER.unpack_from(self.buf, 0)[0] == seq:
+                self.last_seq, self.last_payload = seq, payload
+                return payload
+    
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class ExecutionClient:
+    """Web-process end of the Unix socket to the execution process.
+    
+    Requests carry an id; a reader thread hands each reply to the waiting
+    request thread, so concurrent Flask requests share one connection.
+    """
+    
+    def __init__(self, address, authkey, timeout):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.waiting = {}
+        self.next_id = 0
+    
+    def connect(self, deadline):
+        while True:
+            try:
+                self.conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        threading.Thread(target=self._read_replies, name='execution_client', daemon=True).start()
+    
+    def _read_replies(self):
+        try:
+            while True:
+                request_id, reply = self.conn.recv()
+                waiter = self.waiting.pop(request_id, None)
+                if waiter:
+                    waiter[1] = reply
+                    waiter[0].set()
+        except (EOFError, OSError):
+            self.conn = None
+            for waiter in list(self.waiting.values()):
+                waiter[0].set()
+    
+    def request(self, message):
+        """Send a message and wait for its reply. Returns None on timeout or a lost connection."""
+        if self.conn is None:
+            return None
+        waiter = [threading.Event(), None]
+        with self.send_lock:
+            self.next_id += 1
+            request_id = self.next_id
+            self.waiting[request_id] = waiter
+            self.conn.send((request_id, message))
+        if not waiter[0].wait(self.timeout):
+            self.waiting.pop(request_id, None)
+        return waiter[1]
+
+def run_execution_process(address, authkey, shm_name):
+    """Entry point of the execution process: owns IB and the order state, serves the web process."""
+    suite = SPYTradingSuite(role='execution')
+    suite.serve_execution(address, authkey, SharedStateBlock(name=shm_name))
+
+class SPYTradingSuite:
+    # Command types that may run on a data connection instead of the order connection
+    COMMAND_ROLES = {
+        'refresh_chain': 'reference',
+        'qualify': 'reference',
+        'refresh_iv_surface': 'reference',
+        'quotes_subscribe': 'market_data',
+        'quotes_release': 'market_data'
+    }
+    
+    # Shared with Flask threads through the copy-on-write state store
+    ib_connected = StoreField('ib_connected')
+    last_ib_error = StoreField('last_ib_error')
+    orders = StoreField('orders')
+    trades = StoreField('trades')
+    
+    # GET responses the execution process publishes to shared memory for the web process
+    MIRRORED_PATHS = ('/api/status', '/api/symbols', '/api/get_orders', '/api/positions',
+                      '/api/positions?open_only=true', '/api/account', '/api/risk', '/api/pool',
+                      '/api/webhook/stats', '/api/prices', '/api/schedule', '/api/store/dates')
+    
+    # Routes the web process answers itself, from the mirrored market state or the tick store files
+    LOCAL_ENDPOINTS = ('get_startup', 'export_history', 'store_query', 'get_quotes', 'get_ladder', 'get_combo_ladder',
+                       'get_iv_surface', 'start_replay', 'get_replay')
+    
+    # Forwarded paths the execution process applies in arrival order instead of on its request pool
+    PRICE_PATHS = ('/api/update_price', '/webhook/price')
+    
+    def __init__(self, role=None):
+        self.startup = StartupTimer()
+        self.log_queue = queue.Queue()
+        self.setup_logging(role)
+        self.startup.phase('logging')
+        self.ib = None
+        self.state = StateStore(ib_connected=False, last_ib_error=None, orders={}, trades={})
+        self.config = self.load_config()
+        self.startup.phase('config')
+        # 'combined' runs everything in one process; split mode runs a 'web' and an 'execution' process
+        self.role = role or ('web' if self.config['split_process'] else 'combined')
+        self.symbols = {symbol.upper(): SymbolState(symbol.upper(), self.config) for symbol in self.config['symbols']}
+        self.default_symbol = next(iter(self.symbols))
+        self.connect_params = None
+        self.reconnects = 0
+        self.position_book = PositionBook()
+        self.account_cache = AccountCache()
+        self.risk = RiskEngine(self.config)
+        self.alerts = AlertPipeline(self.risk, self.config['webhook_secret'], self.config['webhook_dedup_seconds'])
+        self.quote_cache = QuoteCache(self.config['max_market_data_lines']) if self.config['quote_cache_enabled'] else None
+        self._local_ip = None
+        self.webhook_port = self.config.get('webhook_port', 8080)
+        self.store = TickStore(self.config['store_dir'], self.config['store_flush_rows']) if self.config['store_enabled'] else None
+        self.static = StaticAssets(HTML, self.config['vendor_dir'])
+        self.debug_lock = threading.Lock()
+        self.replays = {}
+        self.scheduler = Scheduler()
+        for job in self.config['scheduled_jobs']:
+            self.scheduler.add(job['type'], Scheduler.next_daily(job['daily']), job.get('params'), daily=job['daily'])
+        self.startup.phase('state')
+        self.app = self.create_flask_app()
+        self.startup.phase('web_app')
+        self.ib_queue = queue.Queue()
+        self.pool = self.build_pool(self.config['ib_pool_size'])
+        self._tls = threading.local()
+        self.execution = None
+        self.shared = None
+        if self.role == 'web':
+            self.start_execution_process()
+        else:
+            self.start_ib_thread()
+            if self.store:
+                threading.Thread(target=self._flush_store, name='store_flusher', daemon=True).start()
+        self.startup.phase('workers')
+        self.logger.info("SPY Trading Suite v4.3 initialized - TV Price Mode")
+    
+    @property
+    def spy_price(self):
+        """Price of the default symbol, kept for the single-symbol API fields"""
+        return self.symbols[self.default_symbol].price
+    
+    def lookup_symbol(self, symbol=None):
+        """Returns (SymbolState, None) for a request's symbol, default symbol when omitted, or (None, error)."""
+        symbol = str(symbol or self.default_symbol).strip().upper()
+        state = self.symbols.get(symbol)
+        if state is None:
+            return None, f"Unknown symbol {symbol} (configured: {', '.join(self.symbols)})"
+        return state, None
+    
+    def setup_logging(self, role=None):
+        app_dir = Path.home() / ".spy_trading_suite"
+        app_dir.mkdir(exist_ok=True)
+        log_dir = app_dir / "logs"
+        log_dir.mkdir(exist_ok=True)
+        
+        # The split-mode execution process rotates its own file; two processes must not rotate one file
+        prefix = "trader_execution_" if role == 'execution' else "trader_"
+        log_file = log_dir / (prefix + datetime.now().strftime('%Y%m%d') + ".log")
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+        file_handler = RotatingFileHandler(log_file, maxBytes=10*1024*1024, backupCount=5)
+        file_handler.setFormatter(formatter)
+        
+        self.logger = logging.getLogger('SPYTradingSuite')
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(file_handler)
+        
+        queue_handler = QueueHandler(self.log_queue)
+        queue_handler.setFormatter(formatter)
+        self.logger.addHandler(queue_handler)
+    
+    def load_config(self):
+        app_dir = Path.home() / ".spy_trading_suite"
+        config_file = app_dir / "config.json"
+        
+        default = {
+            'webhook_port': 8080,
+            'ibkr_host': '127.0.0.1',
+            'ibkr_port': 7497,
+            'ibkr_client_id': 1,
+            'tp_dollars': 0.05,
+            'sl_dollars': 0.03,
+            'risk_max_order_qty': 10,
+            'risk_max_order_notional': 5000,
+            'risk_max_open_orders': 5,
+            'risk_max_open_notional': 20000,
+            'risk_max_strike_exposure': 20,
+            'risk_max_orders_per_minute': 30,
+            'risk_multiplier': 100,
+            'option_tick_size': 0.01,
+            'option_tick_size_above_3': 0.01,
+            'quote_cache_enabled': False,
+            'max_market_data_lines': 40,
+            'quote_strike_width': 2,
+            'market_data_type': 1,
+            'risk_free_rate': 0.045,
+            'default_iv': 0.20,
+            'iv_surface_strike_range': 25,
+            'iv_surface_max_age': 30,
+            'iv_surface_retry_seconds': 10,
+            'auto_strike_otm': 0,
+            'webhook_secret': None,
+            'webhook_dedup_seconds': 2.0,
+            'symbols': ['SPY'],
+            'tv_symbols': {'SPY': 'AMEX:SPY', 'QQQ': 'NASDAQ:QQQ', 'IWM': 'AMEX:IWM'},
+            'ib_pool_size': 1,
+            'auto_reconnect': True,
+            'heartbeat_interval': 2.0,
+            'heartbeat_timeout': 3.0,
+            'reconnect_backoff_initial': 0.5,
+            'reconnect_backoff_max': 30.0,
+            'split_process': False,
+            'split_publish_interval': 0.1,
+            'split_request_timeout': 10.0,
+            'split_shared_bytes': 4 * 1024 * 1024,
+            'server': 'waitress',
+            'server_threads': 8,
+            'server_connection_limit': 200,
+            'server_channel_timeout': 30,
+            'server_backlog': 1024,
+            'vendor_dir': None,
+            'debug_endpoints': False,
+            'debug_token': None,
+            'debug_max_seconds': 60,
+            'store_enabled': True,
+            'store_dir': str(Path.home() / ".spy_trading_suite" / "data"),
+            'store_flush_rows': 512,
+            'store_flush_interval': 1.0,
+            'replay_fill_latency_ms': 0,
+            'broker': 'ib',
+            'sim_ack_latency_ms': 1.0,
+            'sim_fill_latency_ms': 5.0,
+            'sim_partial_fill_ratio': 1.0,
+            'sim_reject_rate': 0.0,
+            'sim_commission_per_contract': 0.65,
+            'sim_account_cash': 100000.0,
+            'sim_seed': None,
+            'scheduled_jobs': [
+                {'type': 'refresh_chain', 'daily': '09:20:00'},
+                {'type': 'warmup', 'daily': '09:25:00'}
+            ],
+            'price_stale_seconds': {'ib': 5.0, 'webhook': 90.0, 'scrape': 5.0},
+            'price_source_margin_ms': 250,
+            'price_max_deviation': 0.05,
+            'price_ib_ticks': False
+        }
+        
+        if config_file.exists():
+            try:
+                with open(config_file, 'r') as f:
+                    default.update(json.load(f))
+            except:
+                pass
+        
+        return default
+    
+    @property
+    def local_ip(self):
+        """LAN address for the banner, probed on first use rather than during startup."""
+        if self._local_ip is None:
+            self._local_ip = self.startup.timed('local_ip', self.get_local_ip)
+        return self._local_ip
+    
+    def warm_start(self):
+        """Background work after the server listens: import the broker API before the first connect needs it."""
+        if self.role != 'web':
+            self.startup.timed('ib_insync', ib_api)
+        self.logger.info(f"Startup: listening after {self.startup.listening_ms}ms, "
+                         f"phases {self.startup.phases}, background {self.startup.background}")
+    
+    def get_local_ip(self):
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+            return ip
         except:
             return "127.0.0.1"
     
+    def start_execution_process(self):
+        """Web role: spawn the execution process and connect to its command socket."""
+        app_dir = Path.home() / ".spy_trading_suite"
+        address = str(app_dir / f"execution-{os.getpid()}.sock")
+        if os.path.exists(address):
+            os.unlink(address)
+        authkey = os.urandom(16)
+        self.shared = SharedStateBlock(size=self.config['split_shared_bytes'])
+        
+        # Spawn, not fork: this process already has Flask and logging threads
+        ctx = multiprocessing.get_context('spawn')
+        self.execution_process = ctx.Process(target=run_execution_process, args=(address, authkey, self.shared.name),
+                                             name='spy-execution', daemon=True)
+        self.execution_process.start()
+        self.execution = ExecutionClient(address, authkey, self.config['split_request_timeout'])
+        self._mirror_payload = self._mirror = None
+        atexit.register(self.stop_execution_process, address)
+        # The UI is served while the child boots; API calls answer 503 until the socket is up
+        threading.Thread(target=self._connect_execution, name='execution_connect', daemon=True).start()
+    
+    def _connect_execution(self):
+        try:
+            self.startup.timed('execution_connect', self.execution.connect, time.monotonic() + 30)
+            self.logger.info(f"Execution process started (pid {self.execution_process.pid})")
+        except Exception as e:
+            self.logger.error(f"Execution process did not come up: {e}")
+
+    def stop_execution_process(self, address):
+        if self.execution_process.is_alive():
+            self.execution_process.terminate()
+            self.execution_process.join(5)
+        self.shared.close(unlink=True)
+        if os.path.exists(address):
+            os.unlink(address)
+    
+    def serve_execution(self, address, authkey, shared):
+        """Execution role: answer forwarded API calls and publish mirrored state until the web process goes away."""
+        self.shared = shared
+        executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='execution_rpc')
+        threading.Thread(target=self._publish_state, name='execution_publisher', daemon=True).start()
+        
+        with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+            conn = listener.accept()
+            send_lock = threading.Lock()
+            
+            def handle(request_id, message):
+                try:
+                    if 'command' in message:
+                        reply = self._forwarded_command(message['command'])
+                    else:
+                        reply = self._dispatch_forwarded(message)
+                except Exception as e:
+                    self.logger.error(f"Forwarded request error: {e}")
+                    reply = {'status': 500, 'body': json.dumps({'status': 'error', 'message': str(e)}).encode(),
+                             'content_type': 'application/json'}
+                with send_lock:
+                    conn.send((request_id, reply))
+            
+            try:
+                while True:
+                    request_id, message = conn.recv()
+                    path = message.get('path', '')
+                    if 'command' in message or path in self.PRICE_PATHS:
+                        # Commands only queue work, and prices must apply in the order they were posted
+                        handle(request_id, message)
+                    elif path.startswith('/api/debug/'):
+                        # A profile holds its thread for up to debug_max_seconds; keep it off the request pool
+                        threading.Thread(target=handle, args=(request_id, message), name='execution_debug', daemon=True).start()
+                    else:
+                        executor.submit(handle, request_id, message)
+            except (EOFError, OSError):
+                self.logger.info("Web process closed the execution channel")
+    
+    def _dispatch_forwarded(self, message):
+        """Run a forwarded HTTP call through this process's own routes."""
+        with self.app.test_request_context(message['path'], method=message['method'], query_string=message['query'],
+                                           data=message['body'], content_type=message['content_type']):
+            response = self.app.full_dispatch_request()
+            return {'status': response.status_code, 'body': response.get_data(), 'content_type': response.content_type}
+    
+    def _forwarded_command(self, cmd):
+        """Queue a command from a route the web process served itself."""
+        if cmd['type'] == 'refresh_iv_surface':
+            state = self.symbols[cmd['symbol']]
+            with state.iv_refresh_lock:
+                if cmd['expiry'] in state.iv_refreshing:
+                    return False
+                state.iv_refreshing.add(cmd['expiry'])
+        self.submit(cmd)
+        return True
+    
+    def _market_state(self):
+        """Prices, chains, IV surfaces and quotes the web process needs to serve read routes itself."""
+        symbols = {}
+        for symbol, state in self.symbols.items():
+            chain = state.option_chain
+            with state.iv_refresh_lock:
+                refreshing = sorted(state.iv_refreshing)
+            symbols[symbol] = {
+                'price': state.price,
+                'source': state.price_source,
+                'updated': state.price_updated,
+                'chain': [chain.expirations, chain.strikes, chain.exchange, chain.fetched_at],
+                'iv_surfaces': dict(state.iv_surfaces),
+                'iv_refreshing': refreshing
+            }
+        return {'ib_connected': self.ib_connected, 'symbols': symbols,
+                'quotes': self.quote_cache.export() if self.quote_cache else None}
+    
+    def _apply_market_state(self, market):
+        """Web role: copy the execution process's market state into this process's symbol and quote replicas."""
+        if market['ib_connected'] != self.ib_connected:
+            self.ib_connected = market['ib_connected']
+        for symbol, data in market['symbols'].items():
+            state = self.symbols[symbol]
+            state.price, state.price_source, state.price_updated = data['price'], data['source'], data['updated']
+            expirations, strikes, exchange, fetched_at = data['chain']
+            if fetched_at != state.option_chain.fetched_at:
+                state.option_chain.update(expirations, strikes, exchange)
+                state.option_chain.fetched_at = fetched_at
+            state.iv_surfaces = data['iv_surfaces']
+            with state.iv_refresh_lock:
+                state.iv_refreshing = set(data['iv_refreshing'])
+        if self.quote_cache and market['quotes']:
+            self.quote_cache.load(market['quotes'])
+    
+    def _publish_state(self):
+        """Publish mirrored responses and market state at a fixed rate."""
+        while True:
+            try:
+                paths = list(self.MIRRORED_PATHS) + [f'/api/suggestion?symbol={symbol}' for symbol in self.symbols]
+                responses = {}
+                for path in paths:
+                    route, _, query = path.partition('?')
+                    reply = self._dispatch_forwarded({'path': route, 'method': 'GET', 'query': query, 'body': None, 'content_type': None})
+                    responses[path] = [reply['status'], reply['body'].decode()]
+                self.shared.publish(json.dumps({'published': time.time(), 'responses': responses,
+                                                'market': self._market_state()}).encode())
+            except Exception as e:
+                self.logger.error(f"State publish error: {e}")
+            time.sleep(self.config['split_publish_interval'])
+    
+    def _mirrored(self):
+        payload = self.shared.read()
+        if payload is not self._mirror_payload:
+            mirror = json.loads(payload) if payload else None
+            if mirror:
+                self._apply_market_state(mirror['market'])
+            self._mirror_payload, self._mirror = payload, mirror
+        return self._mirror
+    
+    def proxy_request(self):
+        """Web role: answer an API call from the mirror or forward it to the execution process."""
+        if not self.execution_process.is_alive():
+            return jsonify({'status': 'error', 'message': 'Execution process not running'}), 503
+        if self.execution.conn is None and request.method != 'GET':
+            return jsonify({'status': 'error', 'message': 'Execution process starting'}), 503
+        
+        key = request.full_path.rstrip('?')
+        if request.method == 'GET' and request.path == '/api/suggestion':
+            state, error = self.lookup_symbol(request.args.get('symbol'))
+            if error:
+                return jsonify({'status': 'error', 'message': error}), 400
+            key = f'/api/suggestion?symbol={state.symbol}'
+        if request.method == 'GET' and (key in self.MIRRORED_PATHS or request.path == '/api/suggestion'):
+            mirror = self._mirrored()
+            if mirror and key in mirror['responses']:
+                status, body = mirror['responses'][key]
+                return self.app.response_class(body, status=status, mimetype='application/json')
+        
+        reply = self.execution.request({
+            'path': request.path,
+            'method': request.method,
+            'query': request.query_string.decode(),
+            'body': request.get_data(),
+            'content_type': request.content_type
+        })
+        if reply is None:
+            return jsonify({'status': 'error', 'message': 'Execution process did not respond'}), 504
+        return self.app.response_class(reply['body'], status=reply['status'], content_type=reply['content_type'])
+    
+    def _flush_store(self):
+        while True:
+            time.sleep(self.config['store_flush_interval'])
+            try:
+                self.store.flush()
+            except Exception as e:
+                self.logger.error(f"Tick store flush error: {e}")
+    
+    def record_order_event(self, event, trade, **fields):
+        if self.store:
+            c = trade.contract
+            self.store.append_order_event(c.symbol, event, trade.order.orderId,
+                                          side=1 if trade.order.action == 'BUY' else -1,
+                                          strike=getattr(c, 'strike', 0.0), right=getattr(c, 'right', ''),
+                                          expiry=getattr(c, 'lastTradeDateOrContractMonth', 0) or 0, **fields)
+    
+    def export_records(self, start, end, symbol=None, events=None, chunk_rows=1000):
+        """Order, fill and P&L records from the tick store, one partition chunk at a time.
+        
+        Fills are replayed through one PositionBook for the whole range, so they
+        carry running position and realized P&L (average cost, gross of
+        commission) across days; each day ends with one 'pnl' record per contract
+        traded that day or still open.
+        """
+        codes = TickStore.ORDER_EVENTS
+        wanted = set(events) if events else None
+        multiplier = self.config['risk_multiplier']
+        book = PositionBook()
+        for date in self.store.dates():
+            if not (start <= date <= end):
+                continue
+            for sym in self.store.symbols(date, 'orders'):
+                if symbol and sym != symbol:
+                    continue
+                traded = set()
+                for chunk in self.store.iter_chunks('orders', sym, date, chunk_rows):
+                    for row in zip(*(chunk[name].tolist() for name, _ in TickStore.SCHEMAS['orders'])):
+                        ts, order_id, event, status, side, qty, price, strike, right, expiry = row
+                        record = {
+                            'record': codes[event],
+                            'time': datetime.fromtimestamp(ts / 1e9, MARKET_TZ).isoformat(timespec='microseconds'),
+                            'date': date,
+                            'symbol': sym,
+                            'order_id': order_id,
+                            'side': 'BUY' if side > 0 else 'SELL' if side < 0 else '',
+                            'qty': qty,
+                            'price': price,
+                            'strike': strike,
+                            'right': right.decode(),
+                            'expiry': str(expiry) if expiry else '',
+                            'status': TickStore.ORDER_STATUSES[status],
+                            'position': '',
+                            'realized_pnl': ''
+                        }
+                        if codes[event] == 'fill' and side:
+                            key = (sym, strike, record['right'], record['expiry'])
+                            info = {'symbol': sym, 'strike': strike, 'right': record['right'], 'expiry': record['expiry']}
+                            book.on_fill(key, info, 'BOT' if side > 0 else 'SLD', qty, price, multiplier)
+                            traded.add(key)
+                            record['position'] = book.positions[key]['qty']
+                            record['realized_pnl'] = round(book.positions[key]['realized_pnl'], 2)
+                        if wanted is None or record['record'] in wanted:
+                            yield record
+                if wanted is None or 'pnl' in wanted:
+                    for key, pos in book.positions.items():
+                        if key[0] != sym or (key not in traded and pos['qty'] == 0):
+                            continue
+                        yield {'record': 'pnl', 'time': '', 'date': date, 'symbol': sym, 'order_id': '', 'side': '',
+                               'qty': '', 'price': pos['avg_cost'], 'strike': pos['strike'], 'right': pos['right'],
+                               'expiry': pos['expiry'], 'status': '', 'position': pos['qty'],
+                               'realized_pnl': round(pos['realized_pnl'], 2)}
+    
+    def build_pool(self, size):
+        """Order connection first (it owns ib_queue), then data connections on the next client IDs."""
+        pool = [PoolMember('orders', {'orders'}, 0, self.ib_queue)]
+        if size == 2:
+            pool.append(PoolMember('data-1', {'reference', 'market_data'}, 1))
+        elif size > 2:
+            # Market data keeps one sticky connection so its lines can be cancelled where they live
+            pool.append(PoolMember('data-1', {'market_data'}, 1))
+            pool += [PoolMember(f'data-{i}', {'reference'}, i) for i in range(2, size)]
+        return pool
+    
+    def submit(self, cmd):
+        """Queue a command on the least-loaded connected member serving its role, else on the order connection."""
+        if self.role == 'web':
+            # Routes served by the web process still queue their IB work in the execution process
+            self.execution.request({'command': cmd})
+            return
+        role = self.COMMAND_ROLES.get(cmd['type'])
+        if role:
+            members = [m for m in self.pool[1:] if role in m.roles and m.connected()]
+            if members:
+                min(members, key=lambda m: m.queue.qsize()).queue.put(cmd)
+                return
+        self.ib_queue.put(cmd)
+    
+    def _thread_ib(self):
+        """The IB connection owned by the calling worker thread."""
+        member = getattr(self._tls, 'member', None)
+        if member is None or 'orders' in member.roles:
+            return self.ib
+        return member.ib
+    
     def start_ib_thread(self):
-        def ib_worker():
+        def ib_worker(member):
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            util.patchAsyncio()
+            self._tls.member = member
+            is_orders = 'orders' in member.roles
             
             while True:
                 try:
-                    cmd = self.ib_queue.get(timeout=1)
-                    if cmd['type'] == 'connect':
-                        self._ib_connect(cmd['host'], cmd['port'], cmd['client_id'])
+                    timeout = 0.1
+                    if is_orders:
+                        for job in self.scheduler.pop_due():
+                            self._run_scheduled(job)
+                        due = self.scheduler.next_due()
+                        if due is not None:
+                            timeout = min(timeout, max(due - time.monotonic() - Scheduler.SPIN, 0))
+                    # The sim broker only advances when the worker enters it; wake for its next event
+                    ib = self.ib if is_orders else member.ib
+                    if isinstance(ib, SimulatedBroker) and ib.isConnected() and ib.next_deadline() is not None:
+                        timeout = min(timeout, max(ib.next_deadline() - time.monotonic(), 0))
+                    # Webhook intents jump ahead of any queued command
+                    if is_orders and self.alerts.pending:
+                        self._ib_process_alerts()
+                    cmd = member.queue.get(timeout=timeout)
+                    member.begin(cmd['type'])
+                    if cmd['type'] == 'alerts':
+                        self._ib_process_alerts()
+                    elif cmd['type'] == 'connect':
+                        if is_orders:
+                            self._ib_connect(cmd['host'], cmd['port'], cmd['client_id'])
+                        else:
+                            self._ib_connect_member(member, cmd['host'], cmd['port'], cmd['client_id'])
                     elif cmd['type'] == 'disconnect':
-                        self._ib_disconnect()
-                    elif cmd['type'] == 'trade':
-                        self._ib_execute_trade(cmd['params'])
+                        if is_orders:
+                            self._ib_disconnect()
+                        else:
+                            self._ib_disconnect_member(member)
+                    elif cmd['type'] in ('trade', 'combo'):
+                        self._ib_execute_command(cmd)
                     elif cmd['type'] == 'cancel':
                         self._ib_cancel_order(cmd['order_id'])
                     elif cmd['type'] == 'close':
                         self._ib_close_position(cmd['trade_id'])
+                    elif cmd['type'] == 'refresh_chain':
+                        self._ib_refresh_chain(cmd['symbol'])
+                    elif cmd['type'] == 'quotes_subscribe':
+                        self._ib_subscribe_quotes(cmd['client_id'], cmd['keys'])
+                    elif cmd['type'] == 'quotes_release':
+                        self._ib_release_quotes(cmd['client_id'])
+                    elif cmd['type'] == 'refresh_iv_surface':
+                        self._ib_refresh_iv_surface(cmd['symbol'], cmd['expiry'])
+                    elif cmd['type'] == 'qualify':
+                        self._ib_qualify_options(cmd['keys'])
                 except queue.Empty:
-                    pass
+                    self._ib_heartbeat(member)
                 except Exception as e:
-                    self.logger.error(f"IB worker error: {e}")
-                    self.last_ib_error = str(e)
+                    self.logger.error(f"IB worker [{member.name}] error: {e}")
+                    member.errors += 1
+                    member.last_error = str(e)
+                    if is_orders:
+                        self.last_ib_error = str(e)
+                finally:
+                    member.end()
         
-        threading.Thread(target=ib_worker, daemon=True).start()
+        for member in self.pool:
+            threading.Thread(target=ib_worker, args=(member,), name=f'ib_worker_{member.name}', daemon=True).start()
+    
+    def _ib_heartbeat(self, member):
+        """Idle tick: pump socket events, probe the connection and drive reconnects."""
+        is_orders = 'orders' in member.roles
+        ib = self.ib if is_orders else member.ib
+        now = time.monotonic()
+        
+        if ib is not None and (self.ib_connected or not is_orders):
+            # The event loop only runs inside IB calls; give it a turn to process ticks and EOF
+            ib.sleep(0)
+            alive = ib.isConnected()
+            if alive and now - member.last_probe >= self.config['heartbeat_interval']:
+                member.last_probe = now
+                try:
+                    ib.run(asyncio.wait_for(ib.reqCurrentTimeAsync(), self.config['heartbeat_timeout']))
+                except asyncio.TimeoutError:
+                    alive = False
+            if not alive:
+                self._on_connection_lost(member, ib)
+            return
+        
+        if member.reconnect_at is not None and now >= member.reconnect_at and self.connect_params:
+            self._ib_reconnect(member)
+    
+    def _on_connection_lost(self, member, ib):
+        self.logger.warning(f"IB connection {member.name} lost")
+        try:
+            ib.disconnect()
+        except Exception:
+            pass
+        if 'orders' in member.roles:
+            self.state.update(ib_connected=False, last_ib_error="Connection lost")
+        else:
+            member.ib = None
+            member.last_error = "Connection lost"
+        if self.config['auto_reconnect'] and self.connect_params:
+            member.reconnect_delay = self.config['reconnect_backoff_initial']
+            member.reconnect_at = time.monotonic() + member.reconnect_delay
+    
+    def _ib_reconnect(self, member):
+        host, port, client_id = self.connect_params
+        self.logger.info(f"Reconnecting {member.name} to IBKR...")
+        if 'orders' in member.roles:
+            self._ib_connect(host, port, client_id, restore=True)
+            ok = self.ib_connected
+        else:
+            self._ib_connect_member(member, host, port, client_id + member.client_offset)
+            ok = member.connected()
+        if ok:
+            member.reconnect_at = None
+            member.last_probe = time.monotonic()
+            self.reconnects += 1
+            return
+        member.reconnect_delay = min(member.reconnect_delay * 2, self.config['reconnect_backoff_max'])
+        member.reconnect_at = time.monotonic() + member.reconnect_delay
+        self.logger.info(f"Reconnect {member.name} failed, retrying in {member.reconnect_delay:.1f}s")
+    
+    def make_broker(self):
+        """A new broker connection for the configured backend: 'ib' (TWS/Gateway) or 'sim'."""
+        ib = ib_api()
+        # Nested event loops for the calling worker's loop; a no-op once patched
+        ib.util.patchAsyncio()
+        if self.config['broker'] == 'sim':
+            return SimulatedBroker(self.config, spot=lambda symbol: self.symbols[symbol].price if symbol in self.symbols else None)
+        return ib.IB()
     
-    def _ib_connect(self, host, port, client_id):
+    def _ib_connect_member(self, member, host, port, client_id):
+        try:
+            if member.ib and member.ib.isConnected():
+                member.ib.disconnect()
+            member.ib = self.make_broker()
+            member.ib.connect(host, port, clientId=client_id, timeout=20)
+            if 'market_data' in member.roles:
+                member.ib.pendingTickersEvent += self._on_pending_tickers
+                if self.quote_cache or self.config['price_ib_ticks']:
+                    member.ib.reqMarketDataType(self.config['market_data_type'])
+            member.last_error = None
+            self.logger.info(f"Pool connection {member.name} connected (client={client_id})")
+            if 'market_data' in member.roles:
+                self._ib_restore_quotes()
+                self._ib_subscribe_underlyings()
+        except Exception as e:
+            member.last_error = str(e)
+            self.logger.error(f"Pool connection {member.name} error: {e}")
+    
+    def _ib_disconnect_member(self, member):
+        try:
+            if 'market_data' in member.roles and self.quote_cache:
+                self.quote_cache.clear()
+            if member.ib:
+                member.ib.disconnect()
+                member.ib = None
+                self.logger.info(f"Pool connection {member.name} disconnected")
+        except Exception as e:
+            self.logger.error(f"Pool disconnect error ({member.name}): {e}")
+    
+    def _ib_connect(self, host, port, client_id, restore=False):
         try:
             self.logger.info(f"Connecting to IBKR {host}:{port} client={client_id}")
             
@@ -1013,23 +4107,367 @@ class SPYTradingSuite:
                 self.logger.info("Disconnecting existing connection")
                 self.ib.disconnect()
             
-            self.ib = IB()
+            # The sim broker plays the exchange too: keep it, and its orders, across reconnects
+            if not isinstance(self.ib, SimulatedBroker):
+                self.ib = self.make_broker()
             self.ib.connect(host, port, clientId=client_id, timeout=20)
             
             if self.ib.isConnected():
-                self.ib_connected = True
-                self.last_ib_error = None
-                self.logger.info(f"Connected to IBKR successfully")
+                self.state.update(ib_connected=True, last_ib_error=None)
+                self.connect_params = (host, port, client_id)
+                self._attach_ib_events()
+                self._ib_sync_open_orders()
+                if self.quote_cache or self.config['price_ib_ticks']:
+                    self.ib.reqMarketDataType(self.config['market_data_type'])
+                self.logger.info(f"{'Reconnected' if restore else 'Connected'} to IBKR successfully")
+                if len(self.pool) == 1:
+                    self._ib_subscribe_underlyings()
+                
+                if restore:
+                    # Chains and qualified contracts survive the drop; data members reconnect on their own
+                    if len(self.pool) == 1:
+                        self._ib_restore_quotes()
+                    for symbol, state in self.symbols.items():
+                        if not state.option_chain.loaded:
+                            self.submit({'type': 'refresh_chain', 'symbol': symbol})
+                    return
+                
+                # Data connections come up behind the order connection; chain loads wait for them
+                for member in self.pool[1:]:
+                    member.queue.put({'type': 'connect', 'host': host, 'port': port,
+                                      'client_id': client_id + member.client_offset})
+                for symbol in self.symbols:
+                    target = self.pool[1] if len(self.pool) > 1 else self.pool[0]
+                    target.queue.put({'type': 'refresh_chain', 'symbol': symbol})
             else:
                 raise Exception("Connection failed")
                 
         except Exception as e:
-            self.ib_connected = False
-            self.last_ib_error = str(e)
+            self.state.update(ib_connected=False, last_ib_error=str(e))
+            if not restore:
+                self.connect_params = None
             self.logger.error(f"IBKR connection error: {e}")
     
+    def _ib_sync_open_orders(self):
+        """Rebind tracked orders to this connection's trades and rebuild working exposure."""
+        open_trades = self.ib.openTrades()
+        orders = dict(self.orders)
+        for trade in self.ib.trades():
+            if trade.order.orderId in orders:
+                orders[trade.order.orderId] = trade
+        working = {}
+        for trade in open_trades:
+            orders[trade.order.orderId] = trade
+            c = trade.contract
+            side = 1 if trade.order.action == 'BUY' else -1
+            legs = None
+            if c.secType == 'OPT':
+                legs = ((RiskEngine.strike_key(c.symbol, c.lastTradeDateOrContractMonth, c.strike, c.right), side),)
+            elif c.secType == 'BAG':
+                by_con_id = {o.conId: o for o in self.symbols[c.symbol].contract_cache.values()} if c.symbol in self.symbols else {}
+                if all(leg.conId in by_con_id for leg in c.comboLegs):
+                    legs = tuple((RiskEngine.strike_key(c.symbol, by_con_id[leg.conId].lastTradeDateOrContractMonth,
+                                                        by_con_id[leg.conId].strike, by_con_id[leg.conId].right),
+                                  leg.ratio * side * (1 if leg.action == 'BUY' else -1))
+                                 for leg in c.comboLegs)
+            if legs:
+                working[trade.order.orderId] = (legs, trade.orderStatus.remaining or trade.order.totalQuantity, trade.order.lmtPrice * side)
+        self.orders = orders
+        self.risk.resync(working)
+        if open_trades:
+            self.logger.info(f"Re-synced {len(open_trades)} open orders")
+    
+    def _ib_restore_quotes(self):
+        if self.quote_cache:
+            ib = self._thread_ib()
+            count = self.quote_cache.resubscribe(lambda contract: ib.reqMktData(contract, '', False, False))
+            if count:
+                self.logger.info(f"Restored {count} market data lines")
+    
+    def _ib_subscribe_underlyings(self):
+        """Stream stock ticks for every symbol into the price arbiter as the 'ib' source."""
+        if not self.config['price_ib_ticks']:
+            return
+        try:
+            ib = self._thread_ib()
+            stocks = [ib_api().Stock(symbol, 'SMART', 'USD') for symbol in self.symbols]
+            ib.qualifyContracts(*stocks)
+            for stock in stocks:
+                ib.reqMktData(stock, '', False, False)
+            self.logger.info(f"Streaming underlying ticks for {', '.join(self.symbols)}")
+        except Exception as e:
+            self.logger.error(f"Underlying tick subscription error: {e}")
+    
+    def _ib_refresh_chain(self, symbol):
+        try:
+            ib = self._thread_ib()
+            stock = ib_api().Stock(symbol, 'SMART', 'USD')
+            ib.qualifyContracts(stock)
+            chains = ib.reqSecDefOptParams(stock.symbol, '', stock.secType, stock.conId)
+            if chains:
+                chain = chains[0]
+                self.symbols[symbol].option_chain.update(chain.expirations, chain.strikes, chain.exchange)
+                self.logger.info(f"{symbol} option chain cached: {len(chain.expirations)} expirations, {len(chain.strikes)} strikes")
+        except Exception as e:
+            self.logger.error(f"Option chain refresh error: {e}")
+    
+    def _attach_ib_events(self):
+        for event, handler in ((self.ib.execDetailsEvent, self._on_exec_details),
+                               (self.ib.commissionReportEvent, self._on_commission_report),
+                               (self.ib.pendingTickersEvent, self._on_pending_tickers),
+                               (self.ib.orderStatusEvent, self._on_order_status),
+                               (self.ib.accountValueEvent, self._on_account_value),
+                               (self.ib.accountSummaryEvent, self._on_account_value),
+                               (self.ib.updatePortfolioEvent, self._on_portfolio_item)):
+            # A broker kept across reconnects (sim) still has last session's listeners
+            event.disconnect(handler)
+            event.connect(handler)
+        
+        # Account updates are subscribed by connect(); add the summary subscription
+        # and seed the cache with whatever has already arrived
+        self.account_cache.clear()
+        try:
+            self.ib.reqAccountSummary()
+        except Exception as e:
+            self.logger.error(f"Account summary subscription error: {e}")
+        for value in self.ib.accountValues() + self.ib.accountSummary():
+            self._on_account_value(value)
+        for item in self.ib.portfolio():
+            self._on_portfolio_item(item)
+        
+        # Replay executions IB already has for this session; duplicates are ignored by execId
+        for fill in self.ib.fills():
+            self._on_exec_details(None, fill)
+            if fill.commissionReport.execId:
+                self._on_commission_report(None, fill, fill.commissionReport)
+    
+    def _on_exec_details(self, trade, fill):
+        contract = fill.contract
+        execution = fill.execution
+        if contract.secType == 'BAG':
+            # Combo fills are booked from their per-leg executions
+            return
+        info = {
+            'symbol': contract.symbol,
+            'strike': getattr(contract, 'strike', None),
+            'expiry': getattr(contract, 'lastTradeDateOrContractMonth', None),
+            'right': getattr(contract, 'right', None),
+            'sec_type': contract.secType
+        }
+        multiplier = float(contract.multiplier) if contract.multiplier else 1.0
+        if self.position_book.on_fill(contract.conId, info, execution.side, execution.shares,
+                                      execution.price, multiplier, execution.execId):
+            if contract.secType == 'OPT':
+                self.risk.on_fill(RiskEngine.strike_key(contract.symbol, info['expiry'], info['strike'], info['right']),
+                                  execution.side, execution.shares)
+            if self.store:
+                self.store.append_order_event(contract.symbol, 'fill', execution.orderId,
+                                              side=1 if execution.side == 'BOT' else -1, qty=execution.shares,
+                                              price=execution.price, strike=info['strike'] or 0.0, right=info['right'] or '',
+                                              expiry=info['expiry'] or 0)
+            self.logger.info(f"Fill: {execution.side} {execution.shares}x {contract.localSymbol} @ ${execution.price}")
+    
+    def _on_commission_report(self, trade, fill, report):
+        self.position_book.on_commission(fill.contract.conId, report.commission, report.execId)
+    
+    def _on_order_status(self, trade):
+        self.risk.on_order_status(trade.order.orderId, trade.orderStatus.status, trade.orderStatus.remaining)
+        self.record_order_event('status', trade, qty=trade.orderStatus.remaining, price=trade.order.lmtPrice,
+                                status=trade.orderStatus.status)
+    
+    def _on_account_value(self, value):
+        self.account_cache.on_value(value.account, value.tag, value.value, value.currency)
+    
+    def _on_portfolio_item(self, item):
+        contract = item.contract
+        self.account_cache.on_portfolio(item.account, contract.conId, {
+            'symbol': contract.symbol,
+            'local_symbol': contract.localSymbol,
+            'sec_type': contract.secType,
+            'strike': getattr(contract, 'strike', None),
+            'expiry': getattr(contract, 'lastTradeDateOrContractMonth', None),
+            'right': getattr(contract, 'right', None),
+            'position': item.position,
+            'market_price': item.marketPrice,
+            'market_value': item.marketValue,
+            'average_cost': item.averageCost,
+            'unrealized_pnl': item.unrealizedPNL,
+            'realized_pnl': item.realizedPNL
+        })
+        self.position_book.mark(contract.conId, item.marketPrice)
+    
+    def _on_pending_tickers(self, tickers):
+        # Delayed market data (types 3/4) is 15 minutes behind the tick's arrival time
+        delay = 900.0 if self.config['market_data_type'] in (3, 4) else 0.0
+        for ticker in tickers:
+            contract = ticker.contract
+            if contract.secType == 'STK':
+                state = self.symbols.get(contract.symbol)
+                price = ticker.last if ticker.last == ticker.last and ticker.last > 0 else ticker.midpoint()
+                if state and price == price and price > 0:
+                    origin = ticker.time.timestamp() - delay if ticker.time else None
+                    self.ingest_price(state, price, source='ib', origin=origin)
+                continue
+            self.position_book.mark(ticker.contract.conId, ticker.marketPrice())
+            if self.quote_cache:
+                self.quote_cache.on_ticker(ticker)
+    
+    def quote_keys_around(self, state, expiry, strike, right):
+        """The selected contract first, then listed strikes on either side."""
+        keys = [(state.symbol, expiry, strike, right)]
+        if state.option_chain.loaded:
+            width = self.config['quote_strike_width']
+            keys += [(state.symbol, expiry, k, right) for k in state.option_chain.nearest_strikes(strike, width) if k != strike]
+        return keys
+    
+    def _ib_qualify_options(self, keys):
+        """Qualify (symbol, expiry, strike, right) keys in one batch, reusing the contract cache."""
+        missing = [key for key in keys if key not in self.symbols[key[0]].contract_cache]
+        if missing:
+            options = [ib_api().Option(symbol, expiry, strike, right, 'SMART') for symbol, expiry, strike, right in missing]
+            for c in self._thread_ib().qualifyContracts(*options):
+                if c.conId:
+                    self.symbols[c.symbol].contract_cache[(c.symbol, c.lastTradeDateOrContractMonth, float(c.strike), c.right)] = c
+        return {key: self.symbols[key[0]].contract_cache[key] for key in keys if key in self.symbols[key[0]].contract_cache}
+    
+    def ingest_price(self, state, price, ts=None, record=True, qualify=True, source=None, origin=None):
+        """Price path shared by every price source and replays.
+        
+        Ticks with a source go through the symbol's arbiter and only the winning
+        source moves the price; replays (no source) set it directly.
+        """
+        if source:
+            best, error = state.arbiter.offer(source, price, origin)
+            if error:
+                self.logger.debug(f"[PRICE] {state.symbol}: {error}")
+            if best is None:
+                return self.update_suggestion(state, qualify)
+            price, published = best[0], best[1] == source and not error
+            state.set_price(price, best[1])
+        else:
+            published = True
+            state.set_price(price)
+        if record and published and self.store:
+            self.store.append_tick(state.symbol, price, ts)
+        return self.update_suggestion(state, qualify)
+    
+    def price_info(self, state):
+        """Published price of a symbol with its source and quote age, as sent back to price posters."""
+        best = state.arbiter.best
+        return {
+            'price': round(state.price, 2) if state.price else None,
+            'source': state.price_source,
+            'age_ms': round((time.time() - best[2]) * 1000, 1) if best and best[1] == state.price_source else None
+        }
+    
+    def update_suggestion(self, state, qualify=True):
+        """Re-target the ATM suggestion for the symbol's price and pre-qualify it when it changes."""
+        suggestion, changed = state.strike_selector.select(state.price)
+        if suggestion is None:
+            return None
+        keys = [(state.symbol, suggestion['expiry'], suggestion['call'], 'C'), (state.symbol, suggestion['expiry'], suggestion['put'], 'P')]
+        if changed and qualify and self.ib_connected:
+            self.submit({'type': 'qualify', 'keys': keys})
+        return dict(suggestion, symbol=state.symbol, qualified=all(key in state.contract_cache for key in keys))
+    
+    def _ib_refresh_iv_surface(self, symbol, expiry):
+        try:
+            state = self.symbols[symbol]
+            spot = state.price
+            if not spot or not state.option_chain.loaded:
+                raise Exception(f"Need a {symbol} price and a cached option chain")
+            
+            width = self.config['iv_surface_strike_range']
+            strikes = [k for k in state.option_chain.strikes if abs(k - spot) <= width]
+            keys = [(symbol, expiry, k, right) for k in strikes for right in ('C', 'P')]
+            contracts = self._ib_qualify_options(keys)
+            
+            # One snapshot request for the whole window
+            tickers = self._thread_ib().reqTickers(*contracts.values())
+            mids = {}
+            for ticker in tickers:
+                c = ticker.contract
+                bid, ask = ticker.bid, ticker.ask
+                if bid == bid and ask == ask and bid > 0 and ask > 0:
+                    mids[(float(c.strike), c.right)] = (bid + ask) / 2
+            
+            points = sorted(mids.items())
+            if not points:
+                raise Exception(f"No two-sided quotes for {expiry}")
+            t = years_to_expiry(expiry)
+            ivs = implied_vols([m for _, m in points], spot, [k for (k, _), _ in points], t,
+                               self.config['risk_free_rate'], [r == 'C' for (_, r), _ in points])
+            
+            smile = {}
+            for ((strike, right), mid), iv in zip(points, ivs):
+                row = smile.setdefault(strike, {'strike': strike, 'call_iv': None, 'put_iv': None, 'call_mid': None, 'put_mid': None})
+                prefix = 'call' if right == 'C' else 'put'
+                row[prefix + '_iv'] = None if iv != iv else round(float(iv), 4)
+                row[prefix + '_mid'] = round(mid, 3)
+            for row in smile.values():
+                # Out-of-the-money side carries the smile; fall back to the other side
+                otm, itm = ('call_iv', 'put_iv') if row['strike'] >= spot else ('put_iv', 'call_iv')
+                row['iv'] = row[otm] if row[otm] is not None else row[itm]
+            
+            state.iv_surfaces[expiry] = {
+                'symbol': symbol,
+                'expiry': expiry,
+                'spot': spot,
+                'years_to_expiry': t,
+                'updated': time.time(),
+                'smile': [smile[k] for k in sorted(smile)]
+            }
+            self.logger.info(f"IV surface refreshed for {symbol} {expiry}: {len(smile)} strikes")
+        except Exception as e:
+            self.logger.error(f"IV surface error: {e}")
+        finally:
+            state = self.symbols.get(symbol)
+            if state:
+                with state.iv_refresh_lock:
+                    state.iv_refreshing.discard(expiry)
+    
+    def surface_iv(self, state, expiry, strike):
+        """Smile IV for a strike from the cached surface, interpolated between listed strikes."""
+        surface = state.iv_surfaces.get(expiry)
+        if not surface:
+            return None
+        points = [(row['strike'], row['iv']) for row in surface['smile'] if row['iv'] is not None]
+        if not points:
+            return None
+        xs, ys = zip(*points)
+        return float(np.interp(strike, xs, ys))
+    
+    def _ib_subscribe_quotes(self, client_id, keys):
+        try:
+            missing = self.quote_cache.set_client_keys(client_id, keys)
+            if missing and self.ib_connected:
+                qualified = self._ib_qualify_options(missing)
+                for key in missing:
+                    contract = qualified.get(key)
+                    if contract is None:
+                        self.logger.warning(f"Quote subscribe: contract not found {key}")
+                        continue
+                    ticker = self._thread_ib().reqMktData(contract, '', False, False)
+                    self.quote_cache.add_line(key, contract, ticker)
+            for contract in self.quote_cache.pop_evictions():
+                self._thread_ib().cancelMktData(contract)
+                self.logger.info(f"Market data line evicted: {contract.localSymbol}")
+        except Exception as e:
+            self.logger.error(f"Quote subscribe error: {e}")
+    
+    def _ib_release_quotes(self, client_id):
+        self.quote_cache.release_client(client_id)
+    
     def _ib_disconnect(self):
         try:
+            # A requested disconnect is final: stop every reconnect loop
+            self.connect_params = None
+            for member in self.pool:
+                member.reconnect_at = None
+            for member in self.pool[1:]:
+                member.queue.put({'type': 'disconnect'})
+            if self.quote_cache:
+                self.quote_cache.clear()
             if self.ib:
                 self.ib.disconnect()
                 self.ib = None
@@ -1045,33 +4483,30 @@ class SPYTradingSuite:
             if not self.ib_connected or not self.ib:
                 raise Exception("IBKR not connected")
             
+            symbol = params.get('symbol', self.default_symbol)
             strike = params.get('strike')
             expiry = params.get('expiry')
             opt_type = params.get('type', 'C')
             price = params.get('price')
             qty = params.get('qty', 1)
             
-            self.logger.info(f"Creating option: SPY {expiry} ${strike} {opt_type}")
-            option = Option('SPY', expiry, strike, opt_type, 'SMART')
+            self.logger.info(f"Creating option: {symbol} {expiry} ${strike} {opt_type}")
+            key = (symbol, expiry, float(strike), opt_type)
             
+            # Suggested and previously traded contracts are already in the contract cache
             self.logger.info(f"Qualifying contract...")
-            contracts = self.ib.qualifyContracts(option)
+            qualified_option = self._ib_qualify_options([key]).get(key)
             
-            if not contracts:
-                raise Exception(f"Contract not found: SPY {expiry} ${strike} {opt_type}. Check if this strike/date exists in IBKR.")
+            if qualified_option is None:
+                raise Exception(f"Contract not found: {symbol} {expiry} ${strike} {opt_type}. Check if this strike/date exists in IBKR.")
             
-            qualified_option = contracts[0]
             self.logger.info(f"Contract qualified: {qualified_option}")
             
             self.logger.info(f"Creating order: BUY {qty} @ ${price}")
-            order = LimitOrder('BUY', qty, price)
+            order = ib_api().LimitOrder('BUY', qty, price)
             
             self.logger.info(f"Placing order with IBKR...")
-            trade = self.ib.placeOrder(qualified_option, order)
-            
-            order_id = trade.order.orderId
-            self.orders[order_id] = trade
-            self.last_order_id = order_id  # Store for API response
+            order_id = self._ib_place(qualified_option, order, params)
             
             self.logger.info(f"[SUCCESS] Order placed: {qty}x ${strike}{opt_type} @ ${price} (Order ID: {order_id})")
             
@@ -1081,23 +4516,151 @@ class SPYTradingSuite:
             import traceback
             self.logger.error(f"Traceback: {traceback.format_exc()}")
             self.last_ib_error = str(e)
-            self.last_order_id = None  # Clear on error
+            self.risk.release(params.get('_risk_token'))
+            raise
+    
+    def _ib_execute_command(self, cmd):
+        """Run a 'trade' or 'combo' command and hand its (order_id, error) to the request waiting on cmd['reply']."""
+        execute = self._ib_execute_combo if cmd['type'] == 'combo' else self._ib_execute_trade
+        reply = cmd.get('reply')
+        try:
+            order_id = execute(cmd['params'])
+            if reply:
+                reply[1] = (order_id, None)
+        except Exception as e:
+            if reply:
+                reply[1] = (None, str(e))
+            raise
+        finally:
+            if reply:
+                reply[0].set()
+    
+    def place_and_wait(self, cmd, timeout=2):
+        """Queue an order command and wait for this command's own result. Returns (order_id, error)."""
+        reply = [threading.Event(), None]
+        self.ib_queue.put(dict(cmd, reply=reply))
+        if not reply[0].wait(timeout):
+            return None, None
+        return reply[1]
+    
+    def _ib_place(self, contract, order, params):
+        """Place an order and start tracking it."""
+        trade = self.ib.placeOrder(contract, order)
+        order_id = trade.order.orderId
+        self.state.set_item('orders', order_id, trade)
+        self.record_order_event('placed', trade, qty=order.totalQuantity, price=order.lmtPrice, status=trade.orderStatus.status)
+        self.risk.on_order_placed(params.get('_risk_token'), order_id)
+        return order_id
+    
+    def _ib_execute_combo(self, params):
+        """Place a multi-leg spread as one BAG order at a net limit price."""
+        try:
+            if not self.ib_connected or not self.ib:
+                raise Exception("IBKR not connected")
+            
+            symbol = params['symbol']
+            keys = [(symbol, leg['expiry'], leg['strike'], leg['type']) for leg in params['legs']]
+            # One qualification round trip for whichever legs are not cached yet
+            contracts = self._ib_qualify_options(keys)
+            missing = [f"{expiry} ${strike:g}{right}" for _, expiry, strike, right in keys if (symbol, expiry, strike, right) not in contracts]
+            if missing:
+                raise Exception(f"Contract not found: {symbol} {', '.join(missing)}")
+            
+            ib = ib_api()
+            bag = ib.Contract(secType='BAG', symbol=symbol, exchange='SMART', currency='USD',
+                              comboLegs=[ib.ComboLeg(conId=contracts[key].conId, ratio=leg['ratio'], action=leg['action'], exchange='SMART')
+                                         for key, leg in zip(keys, params['legs'])])
+            order = ib.LimitOrder(params['action'], params['qty'], params['price'])
+            order_id = self._ib_place(bag, order, params)
+            
+            legs = ' / '.join(f"{leg['action']} {leg['ratio']}x ${leg['strike']:g}{leg['type']}" for leg in params['legs'])
+            self.logger.info(f"[SUCCESS] Combo placed: {params['action']} {params['qty']}x ({legs}) @ ${params['price']} net (Order ID: {order_id})")
+            return order_id
+        except Exception as e:
+            self.logger.error(f"[FAILED] Combo execution error: {e}")
+            self.last_ib_error = str(e)
+            self.risk.release(params.get('_risk_token'))
             raise
     
+    @staticmethod
+    def combo_risk_legs(symbol, legs, action='BUY'):
+        """RiskEngine legs ((key, signed ratio), ...) for validated combo legs; SELL flips every leg."""
+        return tuple((RiskEngine.strike_key(symbol, leg['expiry'], leg['strike'], leg['type']),
+                      leg['ratio'] if leg['action'] == action else -leg['ratio']) for leg in legs)
+    
+    def _ib_process_alerts(self):
+        for intent in self.alerts.drain():
+            intent['t_dequeued'] = time.perf_counter_ns()
+            placed = False
+            try:
+                if intent['action'] == 'buy':
+                    self._ib_execute_trade(intent['params'])
+                    placed = True
+                elif intent['action'] == 'cancel_all':
+                    for order_id in list(self.orders):
+                        self._ib_cancel_order(order_id)
+                    placed = True
+            except Exception as e:
+                self.logger.error(f"[WEBHOOK] Alert {intent.get('id') or ''} failed: {e}")
+                self.alerts.forget(intent)
+            intent['t_done'] = time.perf_counter_ns()
+            self.alerts.record(intent, placed)
+    
+    def schedule_job(self, job_type, at, params=None, daily=None, every=None, name=None):
+        """Schedule a job and wake the order worker so it re-arms its timeout."""
+        job = self.scheduler.add(job_type, at, params, daily, every, name)
+        if job_type == 'trade':
+            # Qualify now so the order is a cache hit when it fires
+            key = (params['symbol'], params['expiry'], float(params['strike']), params['type'])
+            self.submit({'type': 'qualify', 'keys': [key]})
+        self.ib_queue.put({'type': 'wake'})
+        return job
+    
+    def _run_scheduled(self, job):
+        try:
+            self.logger.info(f"[SCHEDULE] Firing {job['name']} (jitter {job['last_jitter_ms']}ms)")
+            if job['type'] == 'trade':
+                params = dict(job['params'])
+                risk_key = RiskEngine.strike_key(params['symbol'], params['expiry'], params['strike'], params['type'])
+                token, risk_error = self.risk.check_order(risk_key, params['qty'], params['price'])
+                if risk_error:
+                    raise Exception(f"Risk check failed: {risk_error}")
+                params['_risk_token'] = token
+                self._ib_execute_trade(params)
+            elif job['type'] == 'cancel_all':
+                for order_id in list(self.orders):
+                    self._ib_cancel_order(order_id)
+            elif job['type'] == 'refresh_chain':
+                for symbol in job['params'].get('symbols', list(self.symbols)):
+                    self.submit({'type': 'refresh_chain', 'symbol': symbol})
+            elif job['type'] == 'warmup':
+                for symbol in job['params'].get('symbols', list(self.symbols)):
+                    state = self.symbols[symbol]
+                    suggestion = self.update_suggestion(state, qualify=False)
+                    if suggestion:
+                        keys = [(symbol, suggestion['expiry'], k, right)
+                                for k in state.option_chain.nearest_strikes(suggestion['atm'])
+                                for right in ('C', 'P')]
+                        self.submit({'type': 'qualify', 'keys': keys})
+            job['last_error'] = None
+        except Exception as e:
+            job['last_error'] = str(e)
+            self.logger.error(f"[SCHEDULE] {job['name']} failed: {e}")
+    
     def _ib_cancel_order(self, order_id):
         try:
-            if order_id in self.orders:
-                trade = self.orders[order_id]
+            trade = self.orders.get(order_id)
+            if trade:
                 self.ib.cancelOrder(trade.order)
-                del self.orders[order_id]
+                self.state.pop_item('orders', order_id)
+                self.record_order_event('cancel', trade, qty=trade.order.totalQuantity, price=trade.order.lmtPrice)
                 self.logger.info(f"Order {order_id} cancelled")
         except Exception as e:
             self.logger.error(f"Cancel error: {e}")
     
     def _ib_close_position(self, trade_id):
         try:
-            if trade_id in self.trades:
-                del self.trades[trade_id]
+            if self.state.pop_item('trades', trade_id) is not None:
                 self.logger.info(f"Position {trade_id} closed")
         except Exception as e:
             self.logger.error(f"Close error: {e}")
@@ -1106,31 +4669,121 @@ class SPYTradingSuite:
         app = Flask(__name__)
         app.logger.setLevel(logging.ERROR)
         
+        if self.role == 'web':
+            @app.before_request
+            def forward_to_execution():
+                if not request.path.startswith(('/api/', '/webhook/')):
+                    return None
+                if request.endpoint in self.LOCAL_ENDPOINTS:
+                    # Bring the local market replicas up to the latest published state
+                    self._mirrored()
+                    return None
+                return self.proxy_request()
+        
         @app.route('/')
         def index():
-            return HTML
+            return self.static.respond(app, self.static.index, immutable=False)
+        
+        @app.route('/assets/<path:name>')
+        def static_asset(name):
+            asset = self.static.assets.get(name)
+            if asset is None:
+                return jsonify({'status': 'error', 'message': 'Not found'}), 404
+            return self.static.respond(app, asset, immutable=True)
         
         @app.route('/api/status')
         def get_status():
             return jsonify({
                 'server': {'status': 'running', 'port': self.webhook_port, 'version': VERSION},
                 'ibkr': {
-                    'status': 'connected' if self.ib_connected else 'disconnected',
-                    'error': self.last_ib_error
+                    'status': 'connected' if self.ib_connected else ('reconnecting' if self.pool[0].reconnect_at is not None else 'disconnected'),
+                    'error': self.last_ib_error,
+                    'reconnects': self.reconnects
                 },
-                'spy_price': round(self.spy_price, 2) if self.spy_price else None
+                'spy_price': round(self.spy_price, 2) if self.spy_price else None,
+                'prices': {symbol: state.summary()['price'] for symbol, state in self.symbols.items()}
+            })
+        
+        @app.route('/api/startup')
+        def get_startup():
+            """Startup phase timings of this process"""
+            snapshot = self.startup.snapshot()
+            snapshot['status'] = 'success'
+            snapshot['role'] = self.role
+            snapshot['ib_insync_loaded'] = _ib_insync is not None
+            return jsonify(snapshot)
+        
+        @app.route('/api/symbols')
+        def get_symbols():
+            """Configured underlyings and their per-symbol state"""
+            return jsonify({
+                'status': 'success',
+                'default': self.default_symbol,
+                'symbols': [state.summary() for state in self.symbols.values()]
             })
         
         @app.route('/api/update_price', methods=['POST'])
         def update_price():
             try:
                 data = request.get_json()
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
                 price = data.get('price')
-                if price:
-                    self.spy_price = price
-                    self.logger.debug(f"Price updated from TV: ${price:.2f}")
-                return jsonify({'status': 'success'})
+                source = data.get('source', 'scrape')
+                if source not in ('scrape', 'manual'):
+                    return jsonify({'status': 'error', 'message': f'Unknown price source: {source}'}), 400
+                if price or source == 'manual':
+                    # An empty manual price clears the override
+                    try:
+                        origin = PriceArbiter.parse_time(data.get('ts'))
+                        price = float(price) if price else None
+                    except (TypeError, ValueError):
+                        return jsonify({'status': 'error', 'message': 'Invalid price or ts'}), 400
+                    suggestion = self.ingest_price(state, price, source=source, origin=origin)
+                    self.logger.debug(f"{state.symbol} {source} price: {price}")
+                else:
+                    suggestion = self.update_suggestion(state)
+                return jsonify({'status': 'success', 'suggestion': suggestion, **self.price_info(state)})
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/execute_combo', methods=['POST'])
+        def execute_combo():
+            """Place a vertical, straddle or other 2-4 leg spread as one net-priced BAG order"""
+            try:
+                data = request.get_json() or {}
+                
+                if not self.ib_connected:
+                    return jsonify({'status': 'error', 'message': 'IBKR not connected'}), 400
+                
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                
+                data, validation_error = state.validator.validate_combo(data)
+                if validation_error:
+                    self.logger.warning(f"[VALIDATION] Combo rejected: {validation_error}")
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                
+                debit = data['price'] if data['action'] == 'BUY' else -data['price']
+                token, risk_error = self.risk.check_legs(self.combo_risk_legs(data['symbol'], data['legs'], data['action']),
+                                                         data['qty'], debit)
+                if risk_error:
+                    self.logger.warning(f"[RISK] Combo rejected: {risk_error}")
+                    return jsonify({'status': 'error', 'message': f'Risk check failed: {risk_error}'}), 400
+                data['_risk_token'] = token
+                
+                order_id, error = self.place_and_wait({'type': 'combo', 'params': data})
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 500
+                if not order_id:
+                    return jsonify({'status': 'error', 'message': 'Order failed - no order ID received'}), 500
+                
+                return jsonify({'status': 'success', 'order_id': order_id,
+                                'message': f"Combo placed: {data['action']} {data['qty']}x @ ${data['price']} net"})
             except Exception as e:
+                self.logger.error(f"Combo execution error: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
         
         @app.route('/api/execute_trade', methods=['POST'])
@@ -1141,23 +4794,33 @@ class SPYTradingSuite:
                 if not self.ib_connected:
                     return jsonify({'status': 'error', 'message': 'IBKR not connected'}), 400
                 
-                # Clear any previous error and order ID
-                self.last_ib_error = None
-                self.last_order_id = None
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
                 
-                # Put trade in queue for IBKR thread to process
-                self.ib_queue.put({'type': 'trade', 'params': data})
+                # Local validation against the cached chain and tick rules
+                data, validation_error = state.validator.validate(data)
+                if validation_error:
+                    self.logger.warning(f"[VALIDATION] Order rejected: {validation_error}")
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
                 
-                # Wait for order to be processed
-                import time
-                time.sleep(2)
+                # Pre-trade risk check; reserves the order's exposure until it is placed or released
+                risk_key = RiskEngine.strike_key(data['symbol'], data['expiry'], data['strike'], data['type'])
+                token, risk_error = self.risk.check_order(risk_key, data['qty'], data['price'])
+                if risk_error:
+                    self.logger.warning(f"[RISK] Order rejected: {risk_error}")
+                    return jsonify({'status': 'error', 'message': f'Risk check failed: {risk_error}'}), 400
+                data['_risk_token'] = token
+                
+                # Hand the trade to the IBKR thread and wait for this order's own ID or error
+                order_id, error = self.place_and_wait({'type': 'trade', 'params': data})
                 
                 # Check if there was an error
-                if self.last_ib_error:
-                    return jsonify({'status': 'error', 'message': self.last_ib_error}), 500
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 500
                 
                 # Check if we got an order ID
-                if not self.last_order_id:
+                if not order_id:
                     return jsonify({'status': 'error', 'message': 'Order failed - no order ID received'}), 500
                 
                 msg = f'Order placed: {data.get("qty")}x @ ${data.get("price")}'
@@ -1165,7 +4828,7 @@ class SPYTradingSuite:
                 return jsonify({
                     'status': 'success', 
                     'message': msg, 
-                    'order_id': self.last_order_id
+                    'order_id': order_id
                 })
             except Exception as e:
                 return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -1183,17 +4846,19 @@ class SPYTradingSuite:
         def get_orders():
             """Get list of active orders and positions"""
             try:
-                if not self.ib_connected:
+                state = self.state.snapshot
+                if not state['ib_connected']:
                     return jsonify({'orders': [], 'positions': []})
                 
                 orders_list = []
-                for order_id, trade in self.orders.items():
+                for order_id, trade in state['orders'].items():
                     orders_list.append({
                         'order_id': order_id,
                         'symbol': trade.contract.symbol,
                         'strike': getattr(trade.contract, 'strike', None),
                         'expiry': getattr(trade.contract, 'lastTradeDateOrContractMonth', None),
                         'right': getattr(trade.contract, 'right', None),
+                        'legs': [{'con_id': leg.conId, 'ratio': leg.ratio, 'action': leg.action} for leg in trade.contract.comboLegs] or None,
                         'action': trade.order.action,
                         'quantity': trade.order.totalQuantity,
                         'limit_price': trade.order.lmtPrice,
@@ -1201,11 +4866,16 @@ class SPYTradingSuite:
                     })
                 
                 positions_list = []
-                for trade_id, trade_data in self.trades.items():
+                for trade_id, trade_data in state['trades'].items():
                     positions_list.append({
                         'trade_id': trade_id,
                         'data': trade_data
                     })
+                for pos in self.position_book.snapshot(open_only=True)['positions']:
+                    positions_list.append({
+                        'trade_id': pos['key'],
+                        'data': pos
+                    })
                 
                 return jsonify({
                     'status': 'success',
@@ -1216,6 +4886,636 @@ class SPYTradingSuite:
                 self.logger.error(f"Error getting orders: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
         
+        @app.route('/api/positions', methods=['GET'])
+        def get_positions():
+            """Get positions and P&L from the in-memory position book"""
+            try:
+                open_only = request.args.get('open_only', 'false').lower() == 'true'
+                snapshot = self.position_book.snapshot(open_only=open_only)
+                snapshot['status'] = 'success'
+                return jsonify(snapshot)
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/account', methods=['GET'])
+        def get_account():
+            """Get account values and portfolio from the subscription-fed cache"""
+            try:
+                snapshot = self.account_cache.snapshot()
+                snapshot['status'] = 'success'
+                snapshot['connected'] = self.ib_connected
+                return jsonify(snapshot)
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/risk', methods=['GET'])
+        def get_risk():
+            """Get risk limits and current exposure aggregates"""
+            try:
+                snapshot = self.risk.snapshot()
+                snapshot['status'] = 'success'
+                return jsonify(snapshot)
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/quotes/subscribe', methods=['POST'])
+        def subscribe_quotes():
+            """Share market data lines for the selected contract and its neighbours"""
+            try:
+                if not self.quote_cache:
+                    return jsonify({'status': 'error', 'message': 'Quote cache disabled (set quote_cache_enabled in config)'}), 400
+                
+                data = request.get_json()
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                normalized, validation_error = state.validator.validate(dict(data, price=1.0, qty=1))
+                if validation_error:
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                
+                keys = self.quote_keys_around(state, normalized['expiry'], normalized['strike'], normalized['type'])
+                self.submit({'type': 'quotes_subscribe', 'client_id': str(data.get('client_id')), 'keys': keys})
+                return jsonify({'status': 'success', 'subscribed': len(keys)})
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/quotes/release', methods=['POST'])
+        def release_quotes():
+            try:
+                if self.quote_cache:
+                    data = request.get_json(force=True, silent=True) or {}
+                    self.submit({'type': 'quotes_release', 'client_id': str(data.get('client_id'))})
+                return jsonify({'status': 'success'})
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/quotes', methods=['GET'])
+        def get_quotes():
+            """Get cached bid/ask/last for a contract and its neighbouring strikes"""
+            try:
+                if not self.quote_cache:
+                    return jsonify({'status': 'error', 'message': 'Quote cache disabled'}), 400
+                
+                state, error = self.lookup_symbol(request.args.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                normalized, validation_error = state.validator.validate(dict(request.args.to_dict(), price=1.0, qty=1))
+                if validation_error:
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                
+                quotes = []
+                for key in self.quote_keys_around(state, normalized['expiry'], normalized['strike'], normalized['type']):
+                    quote = self.quote_cache.quotes.get(key)
+                    if quote:
+                        quotes.append(dict(quote, strike=key[2], expiry=key[1], right=key[3]))
+                return jsonify({'status': 'success', 'quotes': quotes, 'cache': self.quote_cache.snapshot()})
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/ladder', methods=['GET'])
+        def get_ladder():
+            """Black-Scholes ladder: underlying trigger price for every option price rung"""
+            try:
+                args = request.args
+                state, error = self.lookup_symbol(args.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                normalized, validation_error = state.validator.validate(dict(args.to_dict(), price=1.0, qty=1))
+                if validation_error:
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                
+                spot = float(args.get('spot') or state.price or 0)
+                if spot <= 0:
+                    return jsonify({'status': 'error', 'message': f'No {state.symbol} price yet'}), 400
+                iv = float(args.get('iv') or self.surface_iv(state, normalized['expiry'], normalized['strike']) or self.config['default_iv'])
+                rate = float(args.get('rate') or self.config['risk_free_rate'])
+                if not 0 < iv < 5:
+                    return jsonify({'status': 'error', 'message': f'IV must be a decimal fraction, e.g. 0.20 (got {iv})'}), 400
+                
+                # One cached ladder per contract; rebuilt only when the price or IV moves
+                key = (normalized['strike'], normalized['expiry'], normalized['type'], rate)
+                ladder_cache = state.ladder_cache
+                cached = ladder_cache.get(key)
+                if cached is None or abs(cached['spot'] - spot) >= 0.005 or cached['iv'] != iv:
+                    cached = compute_ladder(spot, normalized['strike'], normalized['expiry'], normalized['type'], rate, iv)
+                    cached['iv'] = iv
+                    if len(ladder_cache) >= 32:
+                        ladder_cache.pop(next(iter(ladder_cache)), None)
+                    ladder_cache[key] = cached
+                
+                return jsonify(dict(cached, status='success', rate=rate))
+            except Exception as e:
+                self.logger.error(f"Ladder error: {e}")
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/combo_ladder', methods=['POST'])
+        def get_combo_ladder():
+            """Ladder for a combo's net price: underlying trigger for every net price rung"""
+            try:
+                data = request.get_json() or {}
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                normalized, validation_error = state.validator.validate_combo(dict(data, price=1.0, qty=1))
+                if validation_error:
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                
+                spot = float(data.get('spot') or state.price or 0)
+                if spot <= 0:
+                    return jsonify({'status': 'error', 'message': f'No {state.symbol} price yet'}), 400
+                rate = float(data.get('rate') or self.config['risk_free_rate'])
+                legs = []
+                for leg in normalized['legs']:
+                    iv = float(data.get('iv') or self.surface_iv(state, leg['expiry'], leg['strike']) or self.config['default_iv'])
+                    if not 0 < iv < 5:
+                        return jsonify({'status': 'error', 'message': f'IV must be a decimal fraction, e.g. 0.20 (got {iv})'}), 400
+                    legs.append((leg['strike'], leg['expiry'], leg['type'], leg['ratio'] * (1 if leg['action'] == 'BUY' else -1), iv))
+                
+                key = ('combo', tuple(legs), rate)
+                ladder_cache = state.ladder_cache
+                cached = ladder_cache.get(key)
+                if cached is None or abs(cached['spot'] - spot) >= 0.005:
+                    cached = compute_combo_ladder(spot, legs, rate)
+                    if len(ladder_cache) >= 32:
+                        ladder_cache.pop(next(iter(ladder_cache)), None)
+                    ladder_cache[key] = cached
+                
+                return jsonify(dict(cached, status='success', rate=rate))
+            except Exception as e:
+                self.logger.error(f"Combo ladder error: {e}")
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/iv_surface', methods=['GET'])
+        def get_iv_surface():
+            """Get the cached IV smile for an expiry; stale or missing surfaces are refreshed in the background"""
+            try:
+                state, error = self.lookup_symbol(request.args.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                chain = state.option_chain
+                expiry = request.args.get('expiry') or (chain.expirations[0] if chain.loaded else None)
+                if not expiry:
+                    return jsonify({'status': 'error', 'message': 'No expiry given and no option chain cached'}), 400
+                if chain.loaded and expiry not in chain.expiration_set:
+                    return jsonify({'status': 'error', 'message': f"Expiry {expiry} not in {state.symbol} option chain"}), 400
+                
+                surface = state.iv_surfaces.get(expiry)
+                stale = surface is None or time.time() - surface['updated'] > self.config['iv_surface_max_age']
+                if self.ib_connected and chain.loaded and (stale or request.args.get('refresh') == 'true'):
+                    # One refresh per expiry at a time, and no retry storm while a refresh keeps failing
+                    now = time.monotonic()
+                    with state.iv_refresh_lock:
+                        due = (expiry not in state.iv_refreshing and
+                               now - state.iv_refresh_attempts.get(expiry, -math.inf) >= self.config['iv_surface_retry_seconds'])
+                        if due:
+                            state.iv_refreshing.add(expiry)
+                            state.iv_refresh_attempts[expiry] = now
+                    if due:
+                        self.submit({'type': 'refresh_iv_surface', 'symbol': state.symbol, 'expiry': expiry})
+                refreshing = expiry in state.iv_refreshing
+                
+                if surface is None:
+                    return jsonify({'status': 'pending', 'symbol': state.symbol, 'expiry': expiry, 'refreshing': refreshing, 'smile': []})
+                return jsonify(dict(surface, status='success', refreshing=refreshing))
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/suggestion', methods=['GET'])
+        def get_suggestion():
+            """Get the current ATM / OTM contract suggestion"""
+            try:
+                state, error = self.lookup_symbol(request.args.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                return jsonify({'status': 'success', 'suggestion': self.update_suggestion(state), **self.price_info(state)})
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/prices', methods=['GET'])
+        def get_prices():
+            """Per-symbol price arbitration: the published price and every source's age, latency and tick counts"""
+            return jsonify({'status': 'success',
+                            'symbols': {symbol: state.arbiter.snapshot() for symbol, state in self.symbols.items()}})
+        
+        @app.route('/webhook/price', methods=['POST'])
+        def price_webhook():
+            """TradingView alert carrying the underlying price: {"symbol": "{{ticker}}", "price": {{close}}, "time": "{{timenow}}"}"""
+            try:
+                payload = json.loads(request.get_data(as_text=True) or 'null')
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                return jsonify({'status': 'error', 'message': 'Alert body must be a JSON object'}), 400
+            error = self.alerts.authorize(payload)
+            if error:
+                self.logger.warning(f"[WEBHOOK] Price alert refused: {error}")
+                return jsonify({'status': 'error', 'message': error}), 403
+            state, error = self.lookup_symbol(str(payload.get('symbol') or '').split(':')[-1] or None)
+            if error:
+                return jsonify({'status': 'error', 'message': error}), 400
+            try:
+                price = float(payload['price'])
+                origin = PriceArbiter.parse_time(payload.get('time'))
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'status': 'error', 'message': 'Invalid price or time'}), 400
+            self.ingest_price(state, price, source='webhook', origin=origin)
+            return jsonify({'status': 'success', 'symbol': state.symbol, **self.price_info(state)})
+        
+        @app.route('/webhook/tradingview', methods=['POST'])
+        def tradingview_webhook():
+            """TradingView alert -> validated, risk-checked trade intent on the IB fast path"""
+            t_received = time.perf_counter_ns()
+            alerts = self.alerts
+            alerts.counts['received'] += 1
+            try:
+                try:
+                    payload = json.loads(request.get_data(as_text=True) or 'null')
+                except ValueError:
+                    payload = None
+                error = alerts.authorize(payload)
+                if error:
+                    alerts.counts['rejected'] += 1
+                    self.logger.warning(f"[WEBHOOK] Alert refused: {error}")
+                    return jsonify({'status': 'error', 'message': error}), 403
+                intent, error = alerts.parse(payload)
+                if error:
+                    alerts.counts['rejected'] += 1
+                    self.logger.warning(f"[WEBHOOK] Alert rejected: {error}")
+                    return jsonify({'status': 'error', 'message': error}), 400
+                
+                if alerts.is_duplicate(intent, time.monotonic()):
+                    alerts.counts['duplicates'] += 1
+                    return jsonify({'status': 'duplicate'})
+                
+                if not self.ib_connected:
+                    alerts.counts['rejected'] += 1
+                    return jsonify({'status': 'error', 'message': 'IBKR not connected'}), 503
+                
+                if intent['action'] == 'buy':
+                    state, error = self.lookup_symbol(intent['symbol'])
+                    if error:
+                        alerts.counts['rejected'] += 1
+                        return jsonify({'status': 'error', 'message': error}), 400
+                    
+                    # 'atm' / '0dte' resolve against the symbol's current strike suggestion
+                    suggestion = state.strike_selector.suggestion
+                    if intent['strike'] == 'atm' or intent['expiry'] == '0dte':
+                        if suggestion is None:
+                            alerts.counts['rejected'] += 1
+                            return jsonify({'status': 'error', 'message': 'No ATM suggestion yet (need price and option chain)'}), 400
+                        if intent['strike'] == 'atm':
+                            intent['strike'] = suggestion['call'] if intent['type'] == 'C' else suggestion['put']
+                        if intent['expiry'] == '0dte':
+                            intent['expiry'] = suggestion['expiry']
+                    
+                    params, error = state.validator.validate(intent)
+                    if error is None:
+                        risk_key = RiskEngine.strike_key(params['symbol'], params['expiry'], params['strike'], params['type'])
+                        params['_risk_token'], error = self.risk.check_order(risk_key, params['qty'], params['price'])
+                    if error:
+                        alerts.counts['rejected'] += 1
+                        self.logger.warning(f"[WEBHOOK] Alert rejected: {error}")
+                        return jsonify({'status': 'error', 'message': error}), 400
+                    intent['params'] = params
+                
+                # Claim the dedup slot only now that the alert is going to the worker
+                if alerts.is_duplicate(intent, time.monotonic(), remember=True):
+                    alerts.counts['duplicates'] += 1
+                    if 'params' in intent:
+                        self.risk.release(intent['params']['_risk_token'])
+                    return jsonify({'status': 'duplicate'})
+                
+                intent['t_received'] = t_received
+                intent['t_queued'] = time.perf_counter_ns()
+                alerts.pending.append(intent)
+                alerts.counts['accepted'] += 1
+                self.ib_queue.put({'type': 'alerts'})
+                return jsonify({'status': 'accepted', 'action': intent['action']})
+            except Exception as e:
+                self.logger.error(f"[WEBHOOK] Error: {e}")
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/webhook/stats', methods=['GET'])
+        def webhook_stats():
+            """Alert counts and alert-to-placeOrder latency percentiles"""
+            return jsonify(dict(self.alerts.stats(), status='success'))
+        
+        def debug_guard():
+            """Debug routes need debug_endpoints on and a configured debug_token; the server listens on all interfaces."""
+            if not self.config['debug_endpoints']:
+                return jsonify({'status': 'error', 'message': 'Debug endpoints disabled'}), 404
+            token = self.config['debug_token']
+            if not token:
+                return jsonify({'status': 'error', 'message': 'Debug endpoints need debug_token configured'}), 403
+            if not hmac.compare_digest(request.headers.get('X-Debug-Token', ''), str(token)):
+                return jsonify({'status': 'error', 'message': 'Invalid debug token'}), 403
+            return None
+        
+        def debug_seconds():
+            return min(float(request.args.get('seconds', 5)), self.config['debug_max_seconds'])
+        
+        @app.route('/api/debug/profile', methods=['GET'])
+        def debug_profile():
+            """Sample all thread stacks for a time box; collapsed stacks for flame graphs or a JSON summary"""
+            denied = debug_guard()
+            if denied:
+                return denied
+            if not self.debug_lock.acquire(blocking=False):
+                return jsonify({'status': 'error', 'message': 'A capture is already running'}), 409
+            try:
+                seconds = debug_seconds()
+                interval = max(float(request.args.get('interval', 0.005)), 0.001)
+                profiler = SamplingProfiler(interval).run(seconds)
+                self.logger.info(f"[DEBUG] Profiled {seconds}s: {profiler.samples} samples")
+                if request.args.get('format', 'collapsed') == 'json':
+                    return jsonify(dict(profiler.summary(int(request.args.get('limit', 30))), status='success'))
+                filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+                return app.response_class(profiler.collapsed(), mimetype='text/plain',
+                                          headers={'Content-Disposition': f'attachment; filename={filename}'})
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            finally:
+                self.debug_lock.release()
+        
+        @app.route('/api/debug/tracemalloc', methods=['GET'])
+        def debug_tracemalloc():
+            """Diff two allocation snapshots taken a time box apart"""
+            denied = debug_guard()
+            if denied:
+                return denied
+            if not self.debug_lock.acquire(blocking=False):
+                return jsonify({'status': 'error', 'message': 'A capture is already running'}), 409
+            started = not tracemalloc.is_tracing()
+            try:
+                seconds = debug_seconds()
+                limit = int(request.args.get('limit', 30))
+                if started:
+                    tracemalloc.start(int(request.args.get('frames', 1)))
+                before = tracemalloc.take_snapshot()
+                time.sleep(seconds)
+                after = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                own = (tracemalloc.Filter(False, tracemalloc.__file__),)
+                diff = after.filter_traces(own).compare_to(before.filter_traces(own), 'lineno')
+                return jsonify({
+                    'status': 'success',
+                    'seconds': seconds,
+                    'traced_bytes': current,
+                    'peak_bytes': peak,
+                    'top': [{
+                        'location': str(stat.traceback),
+                        'size_diff': stat.size_diff,
+                        'count_diff': stat.count_diff,
+                        'size': stat.size
+                    } for stat in diff[:limit]]
+                })
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            finally:
+                if started:
+                    tracemalloc.stop()
+                self.debug_lock.release()
+        
+        @app.route('/api/debug/stacks', methods=['GET'])
+        def debug_stacks():
+            """Current stack of every thread as plain text"""
+            denied = debug_guard()
+            if denied:
+                return denied
+            names = {t.ident: t.name for t in threading.enumerate()}
+            dump = []
+            for ident, frame in sys._current_frames().items():
+                dump.append(f"--- {names.get(ident, ident)} ({ident}) ---\n")
+                dump.extend(traceback.format_stack(frame))
+            return app.response_class(''.join(dump), mimetype='text/plain')
+        
+        @app.route('/api/store/dates', methods=['GET'])
+        def store_dates():
+            """Session dates recorded in the tick store"""
+            if not self.store:
+                return jsonify({'status': 'error', 'message': 'Tick store disabled'}), 400
+            return jsonify({'status': 'success', 'dates': self.store.dates(), 'rows_since_start': self.store.rows})
+        
+        @app.route('/api/store/query', methods=['GET'])
+        def store_query():
+            """Rows of one stream/symbol/date partition, optionally bounded by epoch seconds"""
+            try:
+                if not self.store:
+                    return jsonify({'status': 'error', 'message': 'Tick store disabled'}), 400
+                stream = request.args.get('stream', 'ticks')
+                if stream not in TickStore.SCHEMAS:
+                    return jsonify({'status': 'error', 'message': f'Unknown stream: {stream}'}), 400
+                state, error = self.lookup_symbol(request.args.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                date = request.args.get('date') or datetime.now(MARKET_TZ).strftime('%Y%m%d')
+                if not re.fullmatch(r'\d{8}', date):
+                    return jsonify({'status': 'error', 'message': f'Invalid date: {date}'}), 400
+                bound = lambda name: int(float(request.args[name]) * 1e9) if request.args.get(name) else None
+                columns = self.store.query(stream, state.symbol, date, bound('start'), bound('end'))
+                limit = int(request.args.get('limit', 5000))
+                total = len(columns['ts'])
+                rows = {name: column[-limit:].tolist() for name, column in columns.items()}
+                if 'right' in rows:
+                    rows['right'] = [r.decode() for r in rows['right']]
+                return jsonify({'status': 'success', 'symbol': state.symbol, 'date': date, 'stream': stream,
+                                'total': total, 'returned': min(total, limit), 'columns': rows})
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/export', methods=['GET'])
+        def export_history():
+            """Stream order, fill and P&L history as CSV or NDJSON"""
+            if not self.store:
+                return jsonify({'status': 'error', 'message': 'Tick store disabled'}), 400
+            fmt = request.args.get('format', 'csv')
+            if fmt not in ('csv', 'ndjson'):
+                return jsonify({'status': 'error', 'message': f'Unknown format: {fmt}'}), 400
+            today = datetime.now(MARKET_TZ).strftime('%Y%m%d')
+            start = request.args.get('start', today)
+            end = request.args.get('end', start)
+            if not (re.fullmatch(r'\d{8}', start) and re.fullmatch(r'\d{8}', end)):
+                return jsonify({'status': 'error', 'message': 'start/end must be YYYYMMDD'}), 400
+            symbol = request.args.get('symbol')
+            if symbol:
+                state, error = self.lookup_symbol(symbol)
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                symbol = state.symbol
+            events = [e for e in request.args.get('records', '').split(',') if e] or None
+            
+            records = self.export_records(start, end, symbol, events)
+            columns = ('record', 'time', 'date', 'symbol', 'order_id', 'side', 'qty', 'price', 'strike', 'right',
+                       'expiry', 'status', 'position', 'realized_pnl')
+            
+            def generate():
+                if fmt == 'ndjson':
+                    for record in records:
+                        yield json.dumps(record) + '\n'
+                    return
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                
+                def drain():
+                    data = buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    return data
+                
+                # The header goes out alone so the download starts before the first batch is read
+                writer.writerow(columns)
+                yield drain()
+                for i, record in enumerate(records, 1):
+                    writer.writerow([record[c] for c in columns])
+                    if i % 500 == 0:
+                        yield drain()
+                tail = drain()
+                if tail:
+                    yield tail
+            
+            filename = f"trades_{start}_{end}.{fmt}"
+            return app.response_class(stream_with_context(generate()),
+                                      mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+                                      headers={'Content-Disposition': f'attachment; filename={filename}'})
+        
+        @app.route('/api/replay', methods=['POST'])
+        def start_replay():
+            """Replay a recorded session into the simulated fill model"""
+            try:
+                if not self.store:
+                    return jsonify({'status': 'error', 'message': 'Tick store disabled'}), 400
+                if any(r.status == 'running' for r in self.replays.values()):
+                    return jsonify({'status': 'error', 'message': 'A replay is already running'}), 409
+                data = request.get_json() or {}
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                date = str(data.get('date') or datetime.now(MARKET_TZ).strftime('%Y%m%d'))
+                if not re.fullmatch(r'\d{8}', date):
+                    return jsonify({'status': 'error', 'message': f'Invalid date: {date}'}), 400
+                session = datetime.strptime(date, '%Y%m%d').replace(tzinfo=MARKET_TZ)
+                
+                orders = []
+                for o in data.get('orders', []):
+                    at = o.get('at', '09:30:00')
+                    if isinstance(at, str):
+                        h, m, sec = (at.split(':') + ['0', '0'])[:3]
+                        ts = session.replace(hour=int(h), minute=int(m), second=int(float(sec))).timestamp()
+                    else:
+                        ts = float(at)
+                    orders.append({
+                        'ts': int(ts * 1e9),
+                        'strike': 'atm' if str(o.get('strike', 'atm')).lower() == 'atm' else float(o['strike']),
+                        'expiry': str(o.get('expiry', date)),
+                        'type': str(o.get('type', 'C')).upper(),
+                        'qty': int(o.get('qty', 1)),
+                        'price': float(o['price'])
+                    })
+                if data.get('use_recorded_orders'):
+                    placed = TickStore.ORDER_EVENTS.index('placed')
+                    recorded = self.store.query('orders', state.symbol, date)
+                    for i in np.flatnonzero(recorded['event'] == placed):
+                        orders.append({
+                            'ts': int(recorded['ts'][i]),
+                            'strike': float(recorded['strike'][i]),
+                            'expiry': str(int(recorded['expiry'][i])),
+                            'type': recorded['right'][i].decode() or 'C',
+                            'qty': int(recorded['qty'][i]),
+                            'price': float(recorded['price'][i])
+                        })
+                
+                fill_model = SimulatedFillModel(
+                    float(data.get('rate', self.config['risk_free_rate'])),
+                    float(data.get('iv', self.config['default_iv'])),
+                    self.config['risk_multiplier'],
+                    int(float(data.get('fill_latency_ms', self.config['replay_fill_latency_ms'])) * 1e6),
+                    float(data['take_profit']) if data.get('take_profit') is not None else None,
+                    float(data['stop_loss']) if data.get('stop_loss') is not None else None
+                )
+                engine = ReplayEngine(self, state.symbol, date, float(data.get('speed', 0)), orders, fill_model)
+                replay_id = f"{state.symbol}-{date}-{len(self.replays) + 1}"
+                self.replays[replay_id] = engine
+                threading.Thread(target=engine.run, name=f'replay_{replay_id}', daemon=True).start()
+                self.logger.info(f"[REPLAY] Started {replay_id} with {len(orders)} orders")
+                return jsonify({'status': 'success', 'replay_id': replay_id})
+            except (KeyError, ValueError) as e:
+                return jsonify({'status': 'error', 'message': f'Invalid replay request: {e}'}), 400
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/replay/<replay_id>', methods=['GET'])
+        def get_replay(replay_id):
+            """Progress, fills, P&L and per-tick processing cost of a replay"""
+            engine = self.replays.get(replay_id)
+            if engine is None:
+                return jsonify({'status': 'error', 'message': f'Unknown replay: {replay_id}'}), 404
+            return jsonify(dict(engine.report(), replay_id=replay_id, status='success', state=engine.status))
+        
+        @app.route('/api/schedule', methods=['GET'])
+        def get_schedule():
+            """Scheduled jobs and firing jitter"""
+            snapshot = self.scheduler.snapshot()
+            snapshot['status'] = 'success'
+            return jsonify(snapshot)
+        
+        @app.route('/api/schedule', methods=['POST'])
+        def add_schedule():
+            """Schedule a trade, cancel_all, refresh_chain or warmup at an ET time, once or recurring"""
+            try:
+                data = request.get_json() or {}
+                job_type = data.get('type')
+                if job_type not in Scheduler.JOB_TYPES:
+                    return jsonify({'status': 'error', 'message': f'Unknown job type: {job_type}'}), 400
+                
+                params = data.get('params') or {}
+                if job_type == 'trade':
+                    state, error = self.lookup_symbol(params.get('symbol'))
+                    if error:
+                        return jsonify({'status': 'error', 'message': error}), 400
+                    params, error = state.validator.validate(params)
+                    if error:
+                        return jsonify({'status': 'error', 'message': error}), 400
+                
+                daily, every = data.get('daily'), data.get('every')
+                if daily:
+                    at = Scheduler.next_daily(daily)
+                elif isinstance(data.get('at'), (int, float)):
+                    at = float(data['at'])
+                elif data.get('at'):
+                    at = Scheduler.next_daily(data['at'])
+                else:
+                    return jsonify({'status': 'error', 'message': "Provide 'at' or 'daily'"}), 400
+                if every is not None and float(every) <= 0:
+                    return jsonify({'status': 'error', 'message': "'every' must be positive"}), 400
+                
+                job = self.schedule_job(job_type, at, params, daily, float(every) if every else None, data.get('name'))
+                return jsonify({'status': 'success', 'job_id': job['id'], 'at': job['at']})
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @app.route('/api/schedule/cancel', methods=['POST'])
+        def cancel_schedule():
+            data = request.get_json() or {}
+            if not self.scheduler.cancel(data.get('job_id')):
+                return jsonify({'status': 'error', 'message': 'No scheduled job with that ID'}), 404
+            return jsonify({'status': 'success', 'message': 'Job cancelled'})
+        
+        @app.route('/api/pool', methods=['GET'])
+        def get_pool():
+            """Health of every IB connection in the pool"""
+            members = [m.health() for m in self.pool]
+            members[0]['connected'] = self.ib_connected
+            return jsonify({
+                'status': 'success',
+                'size': len(self.pool),
+                'healthy': all(m['connected'] for m in members),
+                'members': members
+            })
+        
         @app.route('/api/close_position', methods=['POST'])
         def close_position():
             try:
@@ -1253,13 +5553,18 @@ class SPYTradingSuite:
         
         @app.route('/api/get_option_chain', methods=['POST'])
         def get_option_chain():
-            """Get available option expirations and strikes for SPY"""
+            """Get available option expirations and strikes for a symbol (SPY by default)"""
             try:
                 if not self.ib_connected:
                     return jsonify({'status': 'error', 'message': 'IBKR not connected'}), 400
                 
-                # Get SPY stock contract
-                stock = Stock('SPY', 'SMART', 'USD')
+                data = request.get_json(silent=True) or {}
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                
+                # Get the underlying stock contract
+                stock = ib_api().Stock(state.symbol, 'SMART', 'USD')
                 self.ib.qualifyContracts(stock)
                 
                 # Request option chain
@@ -1271,14 +5576,16 @@ class SPYTradingSuite:
                 # Get the first chain (usually the main one)
                 chain = chains[0]
                 
+                state.option_chain.update(chain.expirations, chain.strikes, chain.exchange)
+                
                 # Get available expirations and strikes
-                expirations = sorted(chain.expirations)[:10]  # First 10 expirations
-                strikes = sorted(chain.strikes)
+                expirations = state.option_chain.expirations[:10]  # First 10 expirations
+                strikes = state.option_chain.strikes
                 
                 # Find strikes near current price (if we have it)
-                if self.spy_price:
+                if state.price:
                     # Get strikes within $50 of current price
-                    nearby_strikes = [s for s in strikes if abs(s - self.spy_price) <= 50]
+                    nearby_strikes = [s for s in strikes if abs(s - state.price) <= 50]
                     strikes_to_show = sorted(nearby_strikes)[:20]  # Show 20 strikes near money
                 else:
                     strikes_to_show = strikes[:20]  # Just show first 20
@@ -1287,6 +5594,8 @@ class SPYTradingSuite:
                     'status': 'success',
                     'expirations': expirations,
                     'strikes': strikes_to_show,
+                    'symbol': state.symbol,
+                    'current_price': state.price,
                     'current_spy_price': self.spy_price,
                     'exchange': chain.exchange,
                     'message': f'Found {len(expirations)} expirations and {len(strikes_to_show)} nearby strikes'
@@ -1308,7 +5617,17 @@ class SPYTradingSuite:
                 expiry = data.get('expiry')
                 opt_type = data.get('type', 'C')
                 
-                option = Option('SPY', expiry, strike, opt_type, 'SMART')
+                state, error = self.lookup_symbol(data.get('symbol'))
+                if error:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                
+                # Contract-only check: borrow a valid price and qty so only strike/expiry/type are judged
+                normalized, validation_error = state.validator.validate(dict(data, price=1.0, qty=1))
+                if validation_error:
+                    return jsonify({'status': 'error', 'message': validation_error}), 400
+                strike, expiry, opt_type = normalized['strike'], normalized['expiry'], normalized['type']
+                
+                option = ib_api().Option(state.symbol, expiry, strike, opt_type, 'SMART')
                 contracts = self.ib.qualifyContracts(option)
                 
                 if contracts:
@@ -1328,7 +5647,7 @@ class SPYTradingSuite:
                 else:
                     return jsonify({
                         'status': 'error',
-                        'message': f'Contract not found: SPY {expiry} ${strike} {opt_type}'
+                        'message': f'Contract not found: {state.symbol} {expiry} ${strike} {opt_type}'
                     }), 404
                     
             except Exception as e:
@@ -1346,6 +5665,23 @@ class SPYTradingSuite:
         return app
     
     def run(self, port=8080):
+        server = None
+        if self.config['server'] == 'waitress':
+            try:
+                from waitress import create_server
+            except ImportError:
+                self.logger.warning("waitress not installed (pip install waitress) - using the Flask development server")
+            else:
+                # Bind before anything else so the dashboard is reachable as early as possible
+                server = create_server(self.app, host='0.0.0.0', port=port,
+                                       threads=self.config['server_threads'],
+                                       connection_limit=self.config['server_connection_limit'],
+                                       channel_timeout=self.config['server_channel_timeout'],
+                                       backlog=self.config['server_backlog'],
+                                       ident=None)
+                self.startup.listening()
+        threading.Thread(target=self.warm_start, name='warm_start', daemon=True).start()
+        
         print("\n" + "="*80)
         print(f"SPY Trading Suite v{VERSION} - TRADINGVIEW PRICE EDITION")
         print("="*80)
@@ -1360,6 +5696,15 @@ class SPYTradingSuite:
         print("\nPress CTRL+C to quit\n")
         
         self.logger.info(f"Starting on {self.local_ip}:{port}")
+        if not self.config['webhook_secret']:
+            self.logger.warning("webhook_secret is not set - TradingView webhooks will be refused with 403 until it is configured")
+        if self.config['debug_endpoints'] and not self.config['debug_token']:
+            self.logger.warning("debug_endpoints is on but debug_token is not set - debug routes will be refused with 403")
+        if server:
+            # Fixed worker pool with HTTP/1.1 keep-alive; the IB worker threads are untouched
+            self.logger.info(f"Serving with waitress ({self.config['server_threads']} threads)")
+            server.run()
+            return
         self.app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False, threaded=True)
 
 